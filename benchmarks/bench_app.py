@@ -0,0 +1,247 @@
+# benchmarks/bench_app.py
+"""
+Benchmark ponta a ponta do aplicativo contra um PostgreSQL de testes com solicitações sintéticas.
+Para cada tamanho de base, carrega os dados (dados_sinteticos.py), mede as funções de acesso a dados,
+exportação e formulários e roda as páginas sem navegador (streamlit.testing.v1.AppTest).
+Os tempos vão para um JSON, que pode ser comparado com o de uma versão anterior.
+
+Uso:
+    python benchmarks/bench_app.py --dsn postgresql://postgres@localhost/solicitacao_bench \\
+        --tamanhos 10000 100000 1000000 --saida benchmarks/resultados.json [--comparar anterior.json]
+
+ATENÇÃO: apaga todas as solicitações do banco indicado em --dsn. Use um banco só para isso
+(ex.: docker run -e POSTGRES_HOST_AUTH_METHOD=trust -p 5432:5432 postgres:16, e CREATE DATABASE solicitacao_bench).
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import platform
+import argparse
+import statistics
+import subprocess
+import tempfile
+from datetime import date, datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import psycopg2
+import psycopg2.extensions
+from streamlit.testing.v1 import AppTest
+
+import db
+import exportacao
+import formulario
+from dados_sinteticos import popular
+
+LIMIAR_REGRESSAO = 0.20  # na comparação, destaca operações ao menos 20% mais lentas
+PAGINAS = {"nova_solicitacao": "1_Nova_Solicitação.py", "consulta": "2_Consultar_Solicitações.py", "painel": "4_Painel.py"}
+
+# --- MEDIÇÃO ---
+def medir(funcao, repeticoes=5, antes=None):
+    """
+    Executa 'funcao' 'repeticoes' vezes (chamando 'antes' fora da medição, ex.: limpar o cache)
+    e retorna as estatísticas em milissegundos.
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        if antes:
+            antes()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    return {"repeticoes": repeticoes, "ms_min": round(tempos[0], 3), "ms_mediana": round(statistics.median(tempos), 3),
+            "ms_p95": round(tempos[math.ceil(len(tempos) * 0.95) - 1], 3), "ms_max": round(tempos[-1], 3)}
+
+def frio_e_quente(resultados, nome, funcao, repeticoes=5):
+    # Frio: cache de consultas vazio (vai ao banco); quente: resultado reaproveitado do cache compartilhado
+    resultados[f"{nome}/frio"] = medir(funcao, repeticoes, antes=db.invalidar_cache)
+    funcao()
+    resultados[f"{nome}/quente"] = medir(funcao, repeticoes)
+
+# --- OPERAÇÕES ---
+def medir_conexao(parametros, pool, resultados):
+    def pool_novo():
+        novo = db.PoolDeConexoes(db.POOL_MIN_CONEXOES, db.POOL_MAX_CONEXOES, **parametros)
+        with novo.conexao():
+            pass
+        novo._pool.closeall()
+    resultados["conexao/pool_novo"] = medir(pool_novo, 5)
+    def retirada():
+        with pool.conexao() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+    resultados["conexao/retirada_pool"] = medir(retirada, 50)
+
+def medir_consultas(quantidade, resultados):
+    hoje = date.today()
+    frio_e_quente(resultados, "lista/primeira_pagina", lambda: db.fetch_pagina_solicitacoes())
+    with db.obter_conexao() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT data_solicitacao, id FROM solicitacoes ORDER BY data_solicitacao DESC, id DESC OFFSET %s LIMIT 1;",
+                        (quantidade // 2,))
+            cursor = cur.fetchone()
+        conn.rollback()
+    if cursor:
+        frio_e_quente(resultados, "lista/pagina_do_meio", lambda: db.fetch_pagina_solicitacoes(cursor=cursor))
+    frio_e_quente(resultados, "lista/contagem", lambda: db.contar_solicitacoes())
+    frio_e_quente(resultados, "lista/opcoes_filtro", lambda: db.fetch_opcoes_filtro())
+    # Equivalente atual do antigo fetch_all_solicitacoes: a base inteira em fluxo, sem o DataFrame
+    resultados["lista/todas_em_fluxo"] = medir(lambda: sum(1 for _ in db.iterar_solicitacoes()), 1)
+
+    filtros = {
+        "status": {"status": ("Em Manutenção",)},
+        "periodo_30_dias": {"data_inicio": hoje - timedelta(days=30), "data_fim": hoje},
+        "status_e_periodo": {"status": ("Aguardando Envio", "Em Manutenção"), "data_inicio": hoje - timedelta(days=90), "data_fim": hoje},
+        "incluir_arquivo": {"incluir_arquivo": True},
+    }
+    for nome, filtro in filtros.items():
+        frio_e_quente(resultados, f"filtro/{nome}/pagina", lambda: db.fetch_pagina_solicitacoes(**filtro))
+        frio_e_quente(resultados, f"filtro/{nome}/contagem", lambda: db.contar_solicitacoes(**filtro))
+    buscas = {"prefixo": "mari", "erro_digitacao": "coletr", "trecho_codigo": "00123", "duas_palavras": "maria silva"}
+    for nome, termo in buscas.items():
+        frio_e_quente(resultados, f"busca/{nome}", lambda: db.buscar_solicitacoes(termo))
+
+    frio_e_quente(resultados, "painel/status_por_mes", lambda: db.fetch_resumo("status", por_mes=True))
+    frio_e_quente(resultados, "painel/tempo_manutencao", lambda: db.fetch_tempo_manutencao())
+
+def medir_exportacao(resultados):
+    hoje = date.today()
+    ultimos_90_dias = {"data_inicio": hoje - timedelta(days=90), "data_fim": hoje}
+    def exportar(formato, **filtros):
+        def executar():
+            caminho, _ = exportacao.exportar(formato, **filtros)
+            os.remove(caminho)
+        return executar
+    resultados["exportacao/xlsx_90_dias"] = medir(exportar("Excel (.xlsx)", **ultimos_90_dias), 2)
+    resultados["exportacao/parquet_90_dias"] = medir(exportar("Parquet (.parquet)", **ultimos_90_dias), 2)
+    resultados["exportacao/csv_completo"] = medir(exportar("CSV (.csv)"), 1)
+
+def medir_formularios(resultados):
+    registros = list(db.iterar_solicitacoes(limite=100))
+    if not registros:
+        return
+    dados = formulario.dados_formulario(registros[0])
+    resultados["formulario/individual"] = medir(lambda: formulario.gerar_excel_formulario(dados), 30)
+    itens = [(f"{r['id']}.xlsx", formulario.dados_formulario(r)) for r in registros]
+    with tempfile.TemporaryDirectory() as pasta:
+        resultados["formulario/zip_100"] = medir(lambda: formulario.gerar_zip_formularios(itens, os.path.join(pasta, "f.zip")), 2)
+        resultados["formulario/workbook_100"] = medir(lambda: formulario.gerar_workbook_formularios(itens, os.path.join(pasta, "f.xlsx")), 2)
+
+def _app(pagina, parametros):
+    at = AppTest.from_file(os.path.join(RAIZ, "pages", PAGINAS[pagina]), default_timeout=300)
+    at.secrets["database"] = parametros
+    at.secrets["cloudinary"] = {"cloud_name": "bench", "api_key": "bench", "api_secret": "bench"}
+    at.session_state["identificado"] = True
+    at.session_state["nome"] = "Benchmark da Silva"
+    at.session_state["setor_cargo"] = "TI / Analista"
+    return at
+
+def _rodar(at):
+    at.run()
+    if at.exception:
+        raise RuntimeError(f"A página falhou: {at.exception[0].message}")
+
+def medir_paginas(parametros, resultados):
+    resultados["pagina/nova_solicitacao"] = medir(lambda: _rodar(_app("nova_solicitacao", parametros)), 3)
+    resultados["pagina/consulta/primeira_carga"] = medir(lambda: _rodar(_app("consulta", parametros)), 3, antes=db.invalidar_cache)
+    at = _app("consulta", parametros); _rodar(at)
+    resultados["pagina/consulta/rerun"] = medir(lambda: _rodar(at), 5)
+    def filtrar_status():
+        at = _app("consulta", parametros); _rodar(at)
+        at.sidebar.multiselect[0].set_value(["Em Manutenção"]); _rodar(at)
+    resultados["pagina/consulta/filtro_status"] = medir(filtrar_status, 3, antes=db.invalidar_cache)
+    def buscar():
+        at = _app("consulta", parametros); _rodar(at)
+        at.sidebar.text_input[0].input("maria"); _rodar(at)
+    resultados["pagina/consulta/busca"] = medir(buscar, 3, antes=db.invalidar_cache)
+    resultados["pagina/painel"] = medir(lambda: _rodar(_app("painel", parametros)), 3, antes=db.invalidar_cache)
+
+# --- EXECUÇÃO ---
+def _ambiente(conn):
+    with conn.cursor() as cur:
+        cur.execute("SHOW server_version;")
+        versao_pg = cur.fetchone()[0]
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "postgres": versao_pg,
+            "sistema": platform.platform(), "cpus": os.cpu_count()}
+
+def _contar(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT count(*) FROM solicitacoes;")
+        quantidade = cur.fetchone()[0]
+    conn.rollback()
+    return quantidade
+
+def comparar(anterior, atual):
+    """Imprime, operação a operação, a mediana antes/depois e destaca as regressões."""
+    print(f"\n{'operação':48} {'base':>9} {'antes ms':>10} {'depois ms':>10} {'variação':>9}")
+    for tamanho, dados in atual["tamanhos"].items():
+        antes = anterior.get("tamanhos", {}).get(tamanho, {}).get("operacoes", {})
+        for operacao, medicao in dados["operacoes"].items():
+            if operacao not in antes:
+                continue
+            a, d = antes[operacao]["ms_mediana"], medicao["ms_mediana"]
+            variacao = (d - a) / a if a else 0.0
+            alerta = "  ⚠️" if variacao > LIMIAR_REGRESSAO else ""
+            print(f"{operacao:48} {tamanho:>9} {a:>10.1f} {d:>10.1f} {variacao:>+9.0%}{alerta}")
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Benchmark do aplicativo com dados sintéticos.")
+    parser.add_argument("--dsn", required=True, help="Banco de TESTES (os dados dele são apagados).")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--saida", default=os.path.join(RAIZ, "benchmarks", f"resultados_{datetime.now():%Y%m%d_%H%M%S}.json"))
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparar.")
+    parser.add_argument("--reutilizar", action="store_true", help="Não recarrega a base se ela já tem o tamanho pedido.")
+    parser.add_argument("--sem-paginas", action="store_true", help="Pula as medições com AppTest.")
+    args = parser.parse_args(argumentos)
+
+    os.chdir(RAIZ)  # as páginas abrem assets/ pelo caminho relativo
+    parametros = psycopg2.extensions.parse_dsn(args.dsn)
+    pool = db.PoolDeConexoes(db.POOL_MIN_CONEXOES, db.POOL_MAX_CONEXOES, **parametros)
+    # Todo o aplicativo (funções e páginas rodando neste processo) passa a usar o banco de testes
+    db.get_pool = lambda: pool
+    db.aplicar_migracoes()
+
+    with pool.conexao() as conn:
+        saida = {"gerado_em": datetime.now().isoformat(timespec="seconds"), "ambiente": _ambiente(conn), "tamanhos": {}}
+    for quantidade in args.tamanhos:
+        print(f"--- {quantidade} solicitações ---", flush=True)
+        resultado = {"operacoes": {}}
+        with pool.conexao() as conn:
+            if args.reutilizar and _contar(conn) == quantidade:
+                resultado["carga_s"] = None
+            else:
+                inicio = time.perf_counter()
+                popular(conn, quantidade)
+                resultado["carga_s"] = round(time.perf_counter() - inicio, 2)
+        db.invalidar_cache()
+        operacoes = resultado["operacoes"]
+        etapas = [lambda: medir_conexao(parametros, pool, operacoes), lambda: medir_consultas(quantidade, operacoes),
+                  lambda: medir_exportacao(operacoes), lambda: medir_formularios(operacoes)]
+        if not args.sem_paginas:
+            etapas.append(lambda: medir_paginas(parametros, operacoes))
+        for etapa in etapas:
+            etapa()
+        for operacao, medicao in operacoes.items():
+            print(f"{operacao:48} mediana {medicao['ms_mediana']:>10.1f} ms   p95 {medicao['ms_p95']:>10.1f} ms", flush=True)
+        saida["tamanhos"][str(quantidade)] = resultado
+
+    with open(args.saida, "w", encoding="utf-8") as arquivo:
+        json.dump(saida, arquivo, ensure_ascii=False, indent=2)
+    print(f"\nResultados gravados em {args.saida}")
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            comparar(json.load(arquivo), saida)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
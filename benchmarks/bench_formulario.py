@@ -0,0 +1,42 @@
+# benchmarks/bench_formulario.py
+"""
+Micro-benchmark do renderizador de formulários (formulario.py).
+Mede a primeira renderização (inclui a leitura do logo) e a média/p95 das seguintes.
+
+Uso: python benchmarks/bench_formulario.py [repeticoes]
+"""
+
+import os
+import sys
+import time
+import statistics
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from formulario import gerar_excel_formulario, dados_formulario
+
+SOLICITACAO_EXEMPLO = {
+    "data_solicitacao": datetime(2025, 3, 14, 9, 30), "solicitante": "Maria da Silva", "setor_cargo": "Manutenção / Técnica",
+    "modelo_equipamento": "Coletor XT-200", "descricao_equipamento": None, "codigo_equipamento": "SN-000123",
+    "sistema_alocado": "Expedição", "quantidade": 1, "centro_custo": "CC-1020", "valor": 350.0,
+    "motivo_envio": "Tela não liga após queda.",
+}
+
+def main(repeticoes=200):
+    dados = dados_formulario(SOLICITACAO_EXEMPLO)
+    inicio = time.perf_counter()
+    gerar_excel_formulario(dados)
+    primeira = time.perf_counter() - inicio
+
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        gerar_excel_formulario(dados)
+        tempos.append(time.perf_counter() - inicio)
+    tempos.sort()
+    print(f"primeira renderização: {primeira * 1000:.2f} ms")
+    print(f"{repeticoes} renderizações: média {statistics.mean(tempos) * 1000:.2f} ms, "
+          f"p95 {tempos[int(len(tempos) * 0.95) - 1] * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
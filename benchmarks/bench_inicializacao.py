@@ -0,0 +1,121 @@
+# benchmarks/bench_inicializacao.py
+"""
+Tempo até a primeira tela de cada página: cada medição roda num processo Python novo (nada importado,
+nenhum cache do Streamlit), executa a página uma vez sem navegador (streamlit.testing.v1.AppTest) e
+depois mede os reruns da mesma sessão. A primeira execução completa é o limite superior do primeiro
+paint: inclui os imports feitos pela página, a leitura de assets e o que ela desenha.
+Também registra quais módulos pesados cada página chegou a importar.
+
+Uso:
+    python benchmarks/bench_inicializacao.py --saida antes.json
+    python benchmarks/bench_inicializacao.py --saida depois.json --comparar antes.json
+    python benchmarks/bench_inicializacao.py --dsn postgresql://postgres@localhost/solicitacao_bench   # páginas com banco
+
+Sem --dsn, as páginas que usam o banco param no erro de conexão (medem imports e cabeçalho).
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGINAS = {"inicio": "Início.py", "nova_solicitacao": "pages/1_Nova_Solicitação.py", "consulta": "pages/2_Consultar_Solicitações.py",
+           "importacao": "pages/3_Importar_Solicitações.py", "painel": "pages/4_Painel.py"}
+MODULOS_PESADOS = ("pandas", "numpy", "pyarrow", "PIL", "cloudinary", "xlsxwriter", "psycopg2", "openpyxl")
+SEM_BANCO = {"host": "127.0.0.1", "port": 9, "dbname": "inexistente", "user": "bench", "connect_timeout": 1}
+REPETICOES_RERUN = 5
+
+# --- MEDIÇÃO (PROCESSO FILHO) ---
+def medir_pagina(pagina, parametros):
+    """Roda no processo novo: primeira execução da página e reruns. Retorna os tempos em ms e os módulos importados."""
+    sys.path.insert(0, RAIZ); os.chdir(RAIZ)
+    from streamlit.testing.v1 import AppTest
+    ja_importados = {m for m in MODULOS_PESADOS if m in sys.modules}
+    at = AppTest.from_file(os.path.join(RAIZ, PAGINAS[pagina]), default_timeout=300)
+    at.secrets["database"] = parametros
+    at.secrets["cloudinary"] = {"cloud_name": "bench", "api_key": "bench", "api_secret": "bench"}
+    at.secrets["auth"] = {"master_password": "bench"}
+    if pagina != "inicio":
+        at.session_state["identificado"] = True
+        at.session_state["nome"] = "Benchmark da Silva"
+        at.session_state["setor_cargo"] = "TI / Analista"
+    inicio = time.perf_counter()
+    at.run()
+    primeira = (time.perf_counter() - inicio) * 1000
+    if at.exception:
+        raise RuntimeError(f"A página falhou: {at.exception[0].message}")
+    modulos = [m for m in MODULOS_PESADOS if m in sys.modules and m not in ja_importados]
+    reruns = []
+    for _ in range(REPETICOES_RERUN):
+        inicio = time.perf_counter()
+        at.run()
+        reruns.append((time.perf_counter() - inicio) * 1000)
+    return {"primeira_ms": round(primeira, 1), "rerun_ms": round(statistics.median(reruns), 1), "modulos": modulos,
+            "com_erro": [e.value for e in at.error]}
+
+def _em_processo_novo(pagina, parametros):
+    processo = subprocess.run([sys.executable, os.path.abspath(__file__), "--filho", pagina, "--parametros", json.dumps(parametros)],
+                              capture_output=True, text=True, cwd=RAIZ)
+    if processo.returncode != 0:
+        raise RuntimeError(f"{pagina}: {processo.stderr.strip().splitlines()[-1] if processo.stderr.strip() else 'falhou'}")
+    return json.loads(processo.stdout.strip().splitlines()[-1])
+
+# --- EXECUÇÃO ---
+def comparar(anterior, atual):
+    print(f"\n{'página':20} {'1ª antes':>10} {'1ª depois':>10} {'variação':>9} {'rerun antes':>12} {'rerun depois':>12}")
+    for pagina, medicao in atual["paginas"].items():
+        antes = anterior.get("paginas", {}).get(pagina)
+        if not antes:
+            continue
+        a, d = antes["primeira_ms"], medicao["primeira_ms"]
+        print(f"{pagina:20} {a:>10.0f} {d:>10.0f} {(d - a) / a if a else 0.0:>+9.0%} {antes['rerun_ms']:>12.1f} {medicao['rerun_ms']:>12.1f}")
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Tempo até a primeira tela de cada página, em processos novos.")
+    parser.add_argument("--dsn", help="Banco para as páginas que consultam dados (sem ele, param no erro de conexão).")
+    parser.add_argument("--paginas", nargs="+", choices=list(PAGINAS), default=list(PAGINAS))
+    parser.add_argument("--repeticoes", type=int, default=5, help="Processos novos por página (padrão: 5).")
+    parser.add_argument("--saida", default=os.path.join(RAIZ, "benchmarks", f"inicializacao_{datetime.now():%Y%m%d_%H%M%S}.json"))
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparar.")
+    parser.add_argument("--filho", help=argparse.SUPPRESS)
+    parser.add_argument("--parametros", help=argparse.SUPPRESS)
+    args = parser.parse_args(argumentos)
+
+    if args.filho:
+        print(json.dumps(medir_pagina(args.filho, json.loads(args.parametros)))); return 0
+
+    if args.dsn:
+        import psycopg2.extensions
+        parametros = psycopg2.extensions.parse_dsn(args.dsn)
+    else:
+        parametros = SEM_BANCO
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    saida = {"gerado_em": datetime.now().isoformat(timespec="seconds"), "commit": commit, "com_banco": bool(args.dsn), "paginas": {}}
+    print(f"{'página':20} {'1ª execução ms':>15} {'rerun ms':>10}  módulos pesados importados")
+    for pagina in args.paginas:
+        medicoes = [_em_processo_novo(pagina, parametros) for _ in range(args.repeticoes)]
+        resultado = {"primeira_ms": round(statistics.median(m["primeira_ms"] for m in medicoes), 1),
+                     "rerun_ms": round(statistics.median(m["rerun_ms"] for m in medicoes), 1),
+                     "modulos": medicoes[0]["modulos"], "parou_no_erro": bool(medicoes[0]["com_erro"])}
+        saida["paginas"][pagina] = resultado
+        print(f"{pagina:20} {resultado['primeira_ms']:>15.0f} {resultado['rerun_ms']:>10.1f}  {', '.join(resultado['modulos']) or '-'}"
+              + ("  (parou no erro de conexão)" if resultado["parou_no_erro"] else ""), flush=True)
+
+    with open(args.saida, "w", encoding="utf-8") as arquivo:
+        json.dump(saida, arquivo, ensure_ascii=False, indent=2)
+    print(f"\nResultados gravados em {args.saida}")
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            comparar(json.load(arquivo), saida)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+# benchmarks/bench_memoria_lista.py
+"""
+Memória de uma página da lista de consulta, separando os dois ganhos: a projeção da lista (db.COLUNAS_LISTA)
+contra todas as colunas (o antigo SELECT *), ambas como objetos Python, e os tipos compactos (db.compactar)
+contra a mesma projeção como objetos.
+Os dados são sintéticos, com textos de tamanho parecido com os reais.
+
+Uso: python benchmarks/bench_memoria_lista.py [linhas]
+"""
+
+import os
+import sys
+import random
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import compactar, memoria_df, COLUNAS_LISTA, STATUS_SOLICITACAO, FUSO_HORARIO
+
+SETORES = ["Manutenção / Técnica", "Expedição / Líder", "TI / Analista", "Almoxarifado / Auxiliar", "Produção / Supervisor"]
+SISTEMAS = ["Expedição", "Recebimento", "Inventário", "Separação"]
+CENTROS = ["CC-1020", "CC-2040", "CC-3300", None]
+
+def pagina_sintetica(linhas):
+    aleatorio = random.Random(42)
+    inicio = FUSO_HORARIO.localize(datetime(2025, 1, 1))
+    registros = []
+    for i in range(linhas):
+        url = f"https://res.cloudinary.com/demo/image/upload/v1700000000/solicitacoes/{aleatorio.getrandbits(64):x}.webp"
+        registros.append({
+            "id": 100_000 - i, "data_solicitacao": inicio + timedelta(minutes=37 * i),
+            "solicitante": f"Colaborador {aleatorio.randint(1, 300)} da Silva", "setor_cargo": aleatorio.choice(SETORES),
+            "modelo_equipamento": f"Coletor XT-{aleatorio.randint(100, 999)}",
+            "descricao_equipamento": aleatorio.choice([None, "Coletor de dados com leitor 2D e teclado numérico"]),
+            "codigo_equipamento": f"SN-{aleatorio.randint(0, 10**6):06d}", "sistema_alocado": aleatorio.choice(SISTEMAS),
+            "quantidade": aleatorio.randint(1, 3), "centro_custo": aleatorio.choice(CENTROS),
+            "valor": aleatorio.choice([None, 350.0, 1200.5]),
+            "motivo_envio": "Tela não liga após queda; bateria não segura carga e o gatilho de leitura falha. " * aleatorio.randint(1, 4),
+            "url_imagem": url, "url_miniatura": url.replace("/upload/", "/upload/c_fill,w_140,q_auto,f_auto/"),
+            "status": aleatorio.choice(STATUS_SOLICITACAO), "updated_at": inicio + timedelta(minutes=37 * i + 5),
+        })
+    # Como o pd.read_sql entrega: textos como objetos Python
+    return pd.DataFrame(registros).astype({"valor": object})
+
+def main(linhas=50):
+    completo = pagina_sintetica(linhas)
+    projecao = completo[[coluna.strip() for coluna in COLUNAS_LISTA.split(",")]]
+    lista = compactar(projecao)
+    todas, objetos, compacta = memoria_df(completo), memoria_df(projecao), memoria_df(lista)
+    print(f"{linhas} linhas")
+    print(f"todas as colunas, object:     {todas / 1024:8.1f} KB")
+    print(f"projeção da lista, object:    {objetos / 1024:8.1f} KB ({1 - objetos / todas:.0%} menos que todas as colunas)")
+    print(f"projeção da lista, compacta:  {compacta / 1024:8.1f} KB ({1 - compacta / objetos:.0%} menos que a projeção object, "
+          f"{1 - compacta / todas:.0%} no total)")
+    print(lista.dtypes.to_string())
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,93 @@
+# benchmarks/dados_sinteticos.py
+"""
+Gerador de solicitações sintéticas com distribuições parecidas com as reais (poucos setores e sistemas,
+dezenas de modelos, centenas de solicitantes, a maioria encerrada, fotos em parte delas) e carga em massa
+num PostgreSQL de testes por COPY.
+
+Uso direto (gera um CSV para inspeção): python benchmarks/dados_sinteticos.py 1000 > amostra.csv
+"""
+
+import io
+import csv
+import sys
+import random
+from datetime import datetime, timedelta
+
+import pytz
+
+FUSO_HORARIO = pytz.timezone('America/Sao_Paulo')
+NOMES = ["Maria", "José", "Ana", "João", "Francisca", "Antônio", "Adriana", "Carlos", "Juliana", "Paulo", "Márcia", "Lucas"]
+SOBRENOMES = ["da Silva", "dos Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira", "Lima", "Gomes"]
+SETORES = ["Manutenção / Técnico", "Expedição / Líder", "TI / Analista", "Almoxarifado / Auxiliar", "Produção / Supervisor",
+           "Recebimento / Conferente", "Inventário / Assistente", "Qualidade / Inspetor"]
+SISTEMAS = ["Expedição", "Recebimento", "Inventário", "Separação", "Armazenagem", "Produção"]
+FABRICANTES = ["Coletor", "Impressora", "Leitor", "Tablet", "Balança", "Notebook"]
+CENTROS = ["CC-1020", "CC-2040", "CC-3300", "CC-4100", "CC-5120", None]
+MOTIVOS = ["Tela não liga após queda.", "Bateria não segura carga.", "Gatilho de leitura falhando.",
+           "Teclado com teclas travadas.", "Não conecta ao Wi-Fi.", "Cabeça de impressão falhando, etiquetas borradas."]
+# Pesos aproximados de uma base madura: a maioria já encerrada
+STATUS = [("Concluído", 60), ("Cancelado", 10), ("Em Manutenção", 15), ("Aguardando Envio", 15)]
+COLUNAS = ("data_solicitacao", "solicitante", "setor_cargo", "modelo_equipamento", "descricao_equipamento", "codigo_equipamento",
+           "sistema_alocado", "quantidade", "centro_custo", "valor", "motivo_envio", "url_imagem", "url_miniatura", "status")
+URL_BASE = "https://res.cloudinary.com/demo/image/upload/"
+
+def gerar_solicitacoes(quantidade, semente=42, anos=3):
+    """Gera 'quantidade' solicitações (dicionários com os nomes de coluna do banco), da mais antiga à mais recente."""
+    aleatorio = random.Random(semente)
+    solicitantes = [(f"{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)}", aleatorio.choice(SETORES)) for _ in range(300)]
+    modelos = [f"{aleatorio.choice(FABRICANTES)} {aleatorio.choice('XYZMK')}{aleatorio.choice('TRS')}-{aleatorio.randint(100, 999)}"
+               for _ in range(150)]
+    status, pesos = zip(*STATUS)
+    fim = datetime.now(FUSO_HORARIO)
+    passo = timedelta(days=365 * anos) / max(quantidade, 1)
+    inicio = fim - passo * quantidade
+    for i in range(quantidade):
+        solicitante, setor = aleatorio.choice(solicitantes)
+        com_foto = aleatorio.random() < 0.4
+        arquivo = f"v1700000000/solicitacoes/{aleatorio.getrandbits(64):x}.webp"
+        yield {
+            "data_solicitacao": inicio + passo * i, "solicitante": solicitante, "setor_cargo": setor,
+            "modelo_equipamento": aleatorio.choice(modelos),
+            "descricao_equipamento": aleatorio.choice([None, None, "Equipamento com leitor 2D e teclado numérico"]),
+            "codigo_equipamento": f"SN-{i:07d}", "sistema_alocado": aleatorio.choice(SISTEMAS),
+            "quantidade": aleatorio.choice([1, 1, 1, 2, 3]), "centro_custo": aleatorio.choice(CENTROS),
+            "valor": aleatorio.choice([None, round(aleatorio.uniform(50, 3000), 2)]),
+            "motivo_envio": " ".join(aleatorio.sample(MOTIVOS, aleatorio.randint(1, 3))),
+            "url_imagem": URL_BASE + arquivo if com_foto else None,
+            "url_miniatura": URL_BASE + "c_fill,w_140,q_auto,f_auto/" + arquivo if com_foto else None,
+            "status": aleatorio.choices(status, pesos)[0],
+        }
+
+def _csv(registros):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    for registro in registros:
+        escritor.writerow(["" if registro[coluna] is None else registro[coluna] for coluna in COLUNAS])
+    buffer.seek(0)
+    return buffer
+
+def popular(conn, quantidade, semente=42, lote=100_000):
+    """
+    Apaga todas as solicitações (e resumos, histórico, arquivo) do banco de 'conn' e carrega 'quantidade'
+    sintéticas por COPY, em lotes. Use somente num banco de testes.
+    """
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE solicitacoes, solicitacoes_arquivo, solicitacoes_excluidas, resumo_solicitacoes, "
+                    "resumo_manutencao, historico_status;")
+        registros = gerar_solicitacoes(quantidade, semente)
+        restantes = quantidade
+        while restantes > 0:
+            parte = [next(registros) for _ in range(min(lote, restantes))]
+            cur.copy_expert(f"COPY solicitacoes ({', '.join(COLUNAS)}) FROM STDIN WITH (FORMAT csv)", _csv(parte))
+            restantes -= len(parte)
+    conn.commit()
+    # Estatísticas atualizadas: o planejador escolhe os índices como numa base em produção
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("VACUUM ANALYZE solicitacoes;")
+    finally:
+        conn.autocommit = False
+
+if __name__ == "__main__":
+    sys.stdout.write(_csv(gerar_solicitacoes(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)).getvalue())
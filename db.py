@@ -0,0 +1,717 @@
+# db.py
+
+import io
+import os
+import re
+import time
+import uuid
+import threading
+import warnings
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import streamlit as st
+import pandas as pd
+import pytz
+import psycopg2
+from psycopg2 import pool as pg_pool
+from psycopg2.extras import execute_values
+
+from instrumentacao import registrar, rotulo_sql
+
+warnings.filterwarnings("ignore", message="pandas only supports SQLAlchemy connectable.*", category=UserWarning)
+
+# --- POOL DE CONEXÕES ---
+POOL_MIN_CONEXOES = 1     # abertas já na criação do pool; as demais, sob demanda
+POOL_MAX_CONEXOES = 10    # também o limite de conexões ociosas guardadas para reúso
+POOL_TIMEOUT_ESPERA = 15  # segundos aguardando uma conexão livre antes de desistir
+
+PASTA_MIGRACOES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sql")
+FUSO_HORARIO = pytz.timezone('America/Sao_Paulo')
+TAMANHO_PAGINA = 50
+LIMITE_BUSCA = 100
+CACHE_TTL = 120  # segundos que um resultado de consulta pode ser reaproveitado
+CACHE_MAX_ENTRADAS = 256
+TAMANHO_MINIMO_BUSCA = 2
+TAMANHO_MINIMO_TRIGRAMA = 3  # palavras menores não geram trigramas: o índice não atende trecho nem semelhança
+STATUS_SOLICITACAO = ("Aguardando Envio", "Em Manutenção", "Concluído", "Cancelado")
+
+# Colunas lidas pela aplicação (as colunas geradas de busca ficam só no banco)
+COLUNAS_SOLICITACAO = ("id, data_solicitacao, solicitante, setor_cargo, modelo_equipamento, descricao_equipamento, "
+                       "codigo_equipamento, sistema_alocado, quantidade, centro_custo, valor, motivo_envio, url_imagem, url_miniatura, status, updated_at")
+# Colunas da lista de consulta: só o que é exibido (data, solicitante, modelo, status, foto) e a versão da linha.
+# Os detalhes (motivo, descrição, valores...) são lidos por fetch_solicitacao só quando a linha é impressa.
+COLUNAS_LISTA = "id, data_solicitacao, solicitante, modelo_equipamento, status, url_imagem, url_miniatura, updated_at"
+# Colunas dos relatórios exportados: data no horário local e tipos numéricos simples para CSV/Parquet/Excel
+COLUNAS_EXPORTACAO = ("id::bigint AS id, (data_solicitacao AT TIME ZONE 'America/Sao_Paulo') AS data_solicitacao, solicitante, "
+                      "setor_cargo, modelo_equipamento, descricao_equipamento, codigo_equipamento, sistema_alocado, "
+                      "quantidade::bigint AS quantidade, centro_custo, valor::float8 AS valor, motivo_envio, url_imagem, status")
+
+class CursorCronometrado(psycopg2.extensions.cursor):
+    """
+    Cursor do psycopg2 que mede cada comando (tempo e linhas) na instrumentação. Usado como cursor_factory
+    do pool: vale para todas as consultas do aplicativo, inclusive as do pandas (read_sql) e do execute_values.
+    """
+    def _medir(self, metodo, query, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return metodo(query, *args, **kwargs)
+        finally:
+            registrar(rotulo_sql(query), (time.perf_counter() - inicio) * 1000, inicio=inicio, linhas=self.rowcount)
+
+    def execute(self, query, vars=None):
+        return self._medir(super().execute, query, vars)
+
+    def executemany(self, query, vars_list):
+        return self._medir(super().executemany, query, vars_list)
+
+    def copy_expert(self, sql, file, size=8192):
+        return self._medir(super().copy_expert, sql, file, size)
+
+class PoolDeConexoes:
+    """
+    Pool de conexões compartilhado pelo processo inteiro (todas as sessões e páginas).
+    Verifica a saúde de cada conexão na retirada, reconecta quando o servidor caiu
+    e mantém métricas simples de uso (em uso, ociosas, tempo de espera).
+    Os cursores são cronometrados: cada comando SQL entra na instrumentação com tempo e linhas.
+    """
+    def __init__(self, minconn, maxconn, **parametros):
+        parametros.setdefault("cursor_factory", CursorCronometrado)
+        self._pool = pg_pool.ThreadedConnectionPool(minconn, maxconn, **parametros)
+        # O psycopg2 fecha na devolução toda conexão além de minconn ociosas: com 1, quase toda retirada
+        # concorrente abriria uma conexão nova. Depois de criado, o pool guarda até maxconn ociosas.
+        self._pool.minconn = maxconn
+        # O ThreadedConnectionPool lança erro quando esgotado; o semáforo faz as sessões aguardarem a vez
+        self._vagas = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self.maxconn = maxconn
+        self._em_uso = 0
+        self._retiradas = 0
+        self._reconexoes = 0
+        self._espera_total = 0.0
+        self._espera_maxima = 0.0
+
+    @staticmethod
+    def _saudavel(conn):
+        if conn.closed:
+            return False
+        try:
+            # Cursor comum: a verificação não entra nas medições
+            with conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _retirar(self):
+        conn = self._pool.getconn()
+        if not self._saudavel(conn):
+            # Conexão morta (servidor reiniciado, timeout de rede...): descarta e abre outra
+            self._pool.putconn(conn, close=True)
+            conn = self._pool.getconn()
+            with self._lock: self._reconexoes += 1
+        return conn
+
+    @contextmanager
+    def conexao(self):
+        inicio = time.perf_counter()
+        if not self._vagas.acquire(timeout=POOL_TIMEOUT_ESPERA):
+            raise pg_pool.PoolError("Tempo esgotado aguardando uma conexão livre no pool.")
+        espera = time.perf_counter() - inicio
+        try:
+            conn = self._retirar()
+        except Exception:
+            self._vagas.release(); raise
+        with self._lock:
+            self._em_uso += 1; self._retiradas += 1
+            self._espera_total += espera; self._espera_maxima = max(self._espera_maxima, espera)
+        registrar("pool espera", espera * 1000)
+        try:
+            yield conn
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            self._pool.putconn(conn, close=bool(conn.closed))
+            with self._lock: self._em_uso -= 1
+            self._vagas.release()
+
+    def metricas(self):
+        with self._lock:
+            return {
+                "em_uso": self._em_uso,
+                "ociosas": len(self._pool._pool),
+                "maximo": self.maxconn,
+                "retiradas": self._retiradas,
+                "reconexoes": self._reconexoes,
+                "espera_media_ms": (self._espera_total / self._retiradas * 1000) if self._retiradas else 0.0,
+                "espera_maxima_ms": self._espera_maxima * 1000,
+            }
+
+@st.cache_resource
+def get_pool():
+    return PoolDeConexoes(POOL_MIN_CONEXOES, POOL_MAX_CONEXOES, **st.secrets["database"])
+
+def init_connection():
+    """
+    Garante que o pool compartilhado está disponível. Retorna o pool ou None (exibindo o erro).
+    """
+    try:
+        pool = get_pool()
+        aplicar_migracoes()
+        return pool
+    except Exception as e:
+        st.error(f"Erro ao conectar ao banco de dados: {e}"); return None
+
+@contextmanager
+def obter_conexao():
+    with get_pool().conexao() as conn:
+        yield conn
+
+TRAVA_MIGRACOES = 7_301_001  # chave da trava consultiva: um processo aplica as migrações por vez
+
+@st.cache_resource
+def aplicar_migracoes():
+    """
+    Aplica os scripts da pasta sql/ ainda não registrados em schema_migrations, em ordem alfabética.
+    Cada script roda uma única vez por banco, na mesma transação que o registra: reinícios e deploys não
+    recriam gatilhos, visões e funções (bloqueios exclusivos que esperariam as exportações em andamento e
+    travariam as leituras). A trava consultiva impede dois processos de aplicar o mesmo script ao mesmo tempo.
+    Retorna os scripts aplicados nesta chamada.
+    """
+    arquivos = sorted(f for f in os.listdir(PASTA_MIGRACOES) if f.endswith(".sql"))
+    aplicados = []
+    with obter_conexao() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s);", (TRAVA_MIGRACOES,))
+            cur.execute("CREATE TABLE IF NOT EXISTS schema_migrations (versao text PRIMARY KEY, "
+                        "aplicada_em timestamptz NOT NULL DEFAULT now());")
+            cur.execute("SELECT versao FROM schema_migrations;")
+            registradas = {linha[0] for linha in cur.fetchall()}
+        conn.commit()
+        for arquivo in arquivos:
+            if arquivo in registradas:
+                continue
+            with open(os.path.join(PASTA_MIGRACOES, arquivo), encoding="utf-8") as f:
+                script = f.read()
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_xact_lock(%s);", (TRAVA_MIGRACOES,))
+                cur.execute("SELECT 1 FROM schema_migrations WHERE versao = %s;", (arquivo,))
+                if cur.fetchone() is None:  # outro processo pode ter aplicado enquanto esperávamos a trava
+                    cur.execute(script)
+                    cur.execute("INSERT INTO schema_migrations (versao) VALUES (%s);", (arquivo,))
+                    aplicados.append(arquivo)
+            conn.commit()
+        if aplicados:
+            # Colunas novas da tabela principal também vão para o arquivo e para a visão (sql/007)
+            with conn.cursor() as cur:
+                cur.execute("SELECT to_regproc('sincronizar_arquivo_solicitacoes') IS NOT NULL;")
+                if cur.fetchone()[0]:
+                    cur.execute("SELECT sincronizar_arquivo_solicitacoes();")
+            conn.commit()
+    return aplicados
+
+# --- CACHE DE CONSULTAS ---
+_lock_cache = threading.Lock()
+
+@st.cache_resource
+def _contadores_cache():
+    return {"consultas": 0, "faltas": 0, "invalidacoes": 0}
+
+def _contar_cache(chave):
+    with _lock_cache:
+        _contadores_cache()[chave] += 1
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRADAS, show_spinner=False)
+def _ler_sql_cacheado(query, params):
+    # Só executa quando o par (query, params) não está no cache: cada execução é uma falta
+    _contar_cache("faltas")
+    with obter_conexao() as conn:
+        return pd.read_sql(query, conn, params=params)
+
+def _ler_sql(query, params):
+    """
+    Lê o resultado da consulta do cache compartilhado entre as sessões (chaveado pela query e
+    pelos parâmetros). As escritas chamam invalidar_cache() para ninguém ver dados antigos.
+    """
+    _contar_cache("consultas")
+    return _ler_sql_cacheado(query, list(params))
+
+def invalidar_cache():
+    _ler_sql_cacheado.clear()
+    _contar_cache("invalidacoes")
+
+def geracao_cache():
+    """Muda a cada invalidação: permite às sessões saber se houve escrita desde a última leitura."""
+    with _lock_cache:
+        return _contadores_cache()["invalidacoes"]
+
+def estatisticas_cache():
+    with _lock_cache:
+        contadores = dict(_contadores_cache())
+    contadores["acertos"] = contadores["consultas"] - contadores["faltas"]
+    contadores["taxa_acerto"] = contadores["acertos"] / contadores["consultas"] if contadores["consultas"] else 0.0
+    return contadores
+
+# --- REPRESENTAÇÃO COMPACTA DOS DATAFRAMES ---
+# Os textos usam strings do pyarrow (buffer contíguo em vez de um objeto Python por célula). O status,
+# única coluna da lista com poucos valores distintos, vira categoria, sempre com as mesmas categorias,
+# para que páginas e alterações mescladas (pd.concat) continuem categóricas.
+TIPO_STATUS = pd.CategoricalDtype(STATUS_SOLICITACAO)
+
+def compactar(df):
+    """Converte (em novo DataFrame) as colunas de texto para os tipos compactos. Colunas ausentes são ignoradas."""
+    tipos = {}
+    for coluna in df.columns[df.dtypes == object]:
+        if coluna == "status":
+            # Um status fora da lista (dado antigo) não pode virar NaN: nesse caso a coluna fica como texto
+            conhecidos = df[coluna].dropna().isin(STATUS_SOLICITACAO).all()
+            tipos[coluna] = TIPO_STATUS if conhecidos else "string[pyarrow]"
+        elif df[coluna].map(lambda valor: valor is None or isinstance(valor, str)).all():
+            tipos[coluna] = "string[pyarrow]"
+    return df.astype(tipos) if tipos else df
+
+def memoria_df(df):
+    """Bytes ocupados pelo DataFrame, contando o conteúdo dos textos."""
+    return int(df.memory_usage(deep=True).sum())
+
+# --- FILTROS DA CONSULTA ---
+def _inicio_do_dia(dia):
+    return FUSO_HORARIO.localize(datetime.combine(dia, datetime.min.time()))
+
+def normalizar_busca(termo):
+    """
+    Quebra o termo digitado em palavras (apenas letras e dígitos).
+    Retorna None quando o termo é curto demais para disparar uma busca.
+    """
+    palavras = re.findall(r"\w+", (termo or "").lower())
+    if sum(len(p) for p in palavras) < TAMANHO_MINIMO_BUSCA:
+        return None
+    return " ".join(palavras)
+
+def busca_so_por_prefixo(normalizado):
+    """True quando nenhuma palavra do termo (já normalizado) é longa o bastante para a busca por trigramas."""
+    return max(len(palavra) for palavra in normalizado.split()) < TAMANHO_MINIMO_TRIGRAMA
+
+def _condicao_busca(termo):
+    """
+    Condição e expressão de relevância para a busca em solicitante/modelo/código, sem diferenciar acentos.
+    Casa por prefixo de palavra (índice de texto completo), por semelhança (trigramas, tolera erros
+    de digitação) ou por trecho contido no texto (também atendido pelo índice de trigramas).
+    Termos só com palavras curtas usam apenas o prefixo: sem trigramas, o trecho e a semelhança
+    varreriam a tabela inteira.
+    """
+    normalizado = normalizar_busca(termo)
+    if normalizado is None:
+        return None
+    tsquery = " & ".join(f"{palavra}:*" for palavra in normalizado.split())
+    relevancia = ("(ts_rank(busca_tsv, to_tsquery('simple', f_unaccent(%s))) * 2"
+                  " + word_similarity(f_unaccent(%s), busca_texto))")
+    if busca_so_por_prefixo(normalizado):
+        return "busca_tsv @@ to_tsquery('simple', f_unaccent(%s))", [tsquery], relevancia, [tsquery, normalizado]
+    trecho = "%" + normalizado.replace("_", "\\_") + "%"
+    condicao = ("(busca_tsv @@ to_tsquery('simple', f_unaccent(%s))"
+                " OR f_unaccent(%s) <%% busca_texto"
+                " OR busca_texto LIKE f_unaccent(%s))")
+    return condicao, [tsquery, normalizado, trecho], relevancia, [tsquery, normalizado]
+
+def _montar_filtros(status=None, data_inicio=None, data_fim=None, busca=None):
+    """
+    Converte os filtros da página em condições SQL parametrizadas.
+    'data_fim' é inclusiva (o dia inteiro entra no resultado).
+    """
+    condicoes, params = [], []
+    if status:
+        condicoes.append("status = ANY(%s)"); params.append(list(status))
+    if data_inicio:
+        condicoes.append("data_solicitacao >= %s"); params.append(_inicio_do_dia(data_inicio))
+    if data_fim:
+        condicoes.append("data_solicitacao < %s"); params.append(_inicio_do_dia(data_fim + timedelta(days=1)))
+    busca = _condicao_busca(busca)
+    if busca:
+        condicoes.append(busca[0]); params.extend(busca[1])
+    return condicoes, params
+
+def _clausula_where(condicoes):
+    return ("WHERE " + " AND ".join(condicoes)) if condicoes else ""
+
+def _origem(incluir_arquivo=False):
+    """
+    Tabela consultada e expressão da coluna 'arquivada'. Por padrão só a tabela principal (solicitações
+    em aberto e encerradas recentemente); com o arquivo, a visão que junta as duas tabelas (sql/007_arquivo.sql).
+    """
+    return ("solicitacoes_com_arquivo", "arquivada") if incluir_arquivo else ("solicitacoes", "false AS arquivada")
+
+# --- FUNÇÕES DE ACESSO A DADOS ---
+def inserir_solicitacoes(registros):
+    """
+    Grava um lote de solicitações numa única transação. Cada registro traz um 'id_envio' (uuid):
+    registros já gravados antes são ignorados, o que permite repetir o lote com segurança.
+    Lança a exceção em caso de erro (usada pela fila de envio, fora do contexto de uma página).
+    """
+    aplicar_migracoes()
+    insert_query = """
+    INSERT INTO solicitacoes (id_envio, data_solicitacao, solicitante, setor_cargo, modelo_equipamento, descricao_equipamento,
+                              codigo_equipamento, sistema_alocado, quantidade, centro_custo, valor, motivo_envio,
+                              url_imagem, url_miniatura, status)
+    VALUES %s
+    ON CONFLICT (id_envio) DO NOTHING;
+    """
+    template = """(%(id_envio)s::uuid, %(data_solicitacao)s, %(solicitante)s, %(setor_cargo)s, %(modelo_equipamento)s,
+                   %(descricao_equipamento)s, %(codigo_equipamento)s, %(sistema_alocado)s, %(quantidade)s, %(centro_custo)s,
+                   %(valor)s, %(motivo_envio)s, %(url_imagem)s, %(url_miniatura)s, %(status)s)"""
+    with obter_conexao() as conn:
+        with conn.cursor() as cur:
+            execute_values(cur, insert_query, registros, template=template, page_size=max(len(registros), 1))
+        conn.commit()
+    invalidar_cache()
+
+# Colunas gravadas pela importação em lote, na ordem do CSV enviado ao COPY
+COLUNAS_IMPORTACAO = ("id_envio", "data_solicitacao", "solicitante", "setor_cargo", "modelo_equipamento", "descricao_equipamento",
+                      "codigo_equipamento", "sistema_alocado", "quantidade", "centro_custo", "valor", "motivo_envio", "status")
+
+def importar_solicitacoes(df):
+    """
+    Grava em lote um DataFrame já validado (colunas COLUNAS_IMPORTACAO). As linhas vão por COPY FROM STDIN
+    para uma tabela temporária e são mescladas em 'solicitacoes' com um único INSERT ... SELECT, tudo numa
+    transação: ou entra o arquivo inteiro, ou nada. Linhas cujo id_envio já existe (arquivo importado de
+    novo), na tabela principal ou no arquivo, são ignoradas. Retorna (inseridas, ignoradas); lança a exceção em caso de erro.
+    """
+    aplicar_migracoes()
+    colunas = ", ".join(COLUNAS_IMPORTACAO)
+    buffer = io.StringIO()
+    df.to_csv(buffer, columns=list(COLUNAS_IMPORTACAO), index=False, header=False, date_format="%Y-%m-%d %H:%M:%S%z")
+    buffer.seek(0)
+    with obter_conexao() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                CREATE TEMP TABLE importacao_solicitacoes (
+                    id_envio uuid, data_solicitacao timestamptz, solicitante text, setor_cargo text, modelo_equipamento text,
+                    descricao_equipamento text, codigo_equipamento text, sistema_alocado text, quantidade integer,
+                    centro_custo text, valor numeric, motivo_envio text, status text
+                ) ON COMMIT DROP;
+            """)
+            cur.copy_expert(f"COPY importacao_solicitacoes ({colunas}) FROM STDIN WITH (FORMAT csv)", buffer)
+            cur.execute(f"""
+                INSERT INTO solicitacoes ({colunas})
+                SELECT {colunas} FROM importacao_solicitacoes i
+                WHERE NOT EXISTS (SELECT 1 FROM solicitacoes_arquivo a WHERE a.id_envio = i.id_envio)
+                ON CONFLICT (id_envio) DO NOTHING;
+            """)
+            inseridas = cur.rowcount
+        conn.commit()
+    invalidar_cache()
+    return inseridas, len(df) - inseridas
+
+def consulta_exportacao(incluir_arquivo=False, **filtros):
+    """
+    Retorna (query, params) com todas as solicitações que atendem aos filtros, para leitura em fluxo.
+    """
+    tabela, _ = _origem(incluir_arquivo)
+    condicoes, params = _montar_filtros(**filtros)
+    query = f"SELECT {COLUNAS_EXPORTACAO} FROM {tabela} {_clausula_where(condicoes)} ORDER BY data_solicitacao DESC, id DESC"
+    return query, params
+
+@contextmanager
+def cursor_servidor(query, params, itersize=2000):
+    """
+    Cursor do lado do servidor (nomeado): as linhas chegam em lotes de 'itersize',
+    sem carregar o resultado inteiro na memória da aplicação.
+    """
+    with obter_conexao() as conn:
+        with conn.cursor(name=f"cursor_{uuid.uuid4().hex}") as cur:
+            cur.itersize = itersize
+            cur.execute(query, params)
+            yield cur
+
+def iterar_solicitacoes(limite=None, **filtros):
+    """
+    Percorre em fluxo, como dicionários, as solicitações que atendem aos filtros (no máximo 'limite').
+    """
+    query, params = consulta_exportacao(**filtros)
+    if limite is not None:
+        query += " LIMIT %s"; params = params + [limite]
+    with cursor_servidor(query, params) as cur:
+        colunas = None
+        for linha in cur:
+            colunas = colunas or [desc[0] for desc in cur.description]
+            yield dict(zip(colunas, linha))
+
+def _lista_vazia():
+    """Lista sem linhas, mas com as colunas e tipos da lista de consulta: a página segue sem tratar o caso à parte."""
+    tipos = {"id": "int64", "data_solicitacao": f"datetime64[ns, {FUSO_HORARIO.zone}]", "updated_at": f"datetime64[ns, {FUSO_HORARIO.zone}]"}
+    colunas = COLUNAS_LISTA.split(", ") + ["arquivada"]
+    return compactar(pd.DataFrame({coluna: pd.Series(dtype=tipos.get(coluna, "bool" if coluna == "arquivada" else "object"))
+                                   for coluna in colunas}))
+
+def fetch_pagina_solicitacoes(cursor=None, limite=TAMANHO_PAGINA, incluir_arquivo=False, **filtros):
+    """
+    Busca uma página de solicitações com paginação por chave (keyset) em (data_solicitacao, id).
+    'cursor' é o par (data_solicitacao, id) da última linha da página anterior.
+    Retorna (df, proximo_cursor); proximo_cursor é None quando não há mais páginas.
+    """
+    tabela, arquivada = _origem(incluir_arquivo)
+    condicoes, params = _montar_filtros(**filtros)
+    if cursor is not None:
+        condicoes.append("(data_solicitacao, id) < (%s, %s)"); params.extend(cursor)
+    # Busca uma linha a mais só para saber se existe próxima página
+    query = f"""
+    SELECT {COLUNAS_LISTA}, {arquivada} FROM {tabela} {_clausula_where(condicoes)}
+    ORDER BY data_solicitacao DESC, id DESC LIMIT %s;
+    """
+    try:
+        df = compactar(_ler_sql(query, params + [limite + 1]))
+    except Exception as e:
+        st.error(f"Erro ao buscar dados: {e}"); return _lista_vazia(), None
+    proximo_cursor = None
+    if len(df) > limite:
+        df = df.iloc[:limite]
+        ultima = df.iloc[-1]
+        proximo_cursor = (pd.Timestamp(ultima['data_solicitacao']).to_pydatetime(), int(ultima['id']))
+    return df, proximo_cursor
+
+def buscar_solicitacoes(busca, limite=LIMITE_BUSCA, incluir_arquivo=False, **filtros):
+    """
+    Busca textual ordenada por relevância (as melhores 'limite' ocorrências), combinada aos demais filtros.
+    """
+    tabela, arquivada = _origem(incluir_arquivo)
+    condicao = _condicao_busca(busca)
+    if condicao is None:
+        return _lista_vazia()
+    condicoes, params = _montar_filtros(busca=busca, **filtros)
+    query = f"""
+    SELECT {COLUNAS_LISTA}, {arquivada} FROM {tabela} {_clausula_where(condicoes)}
+    ORDER BY {condicao[2]} DESC, data_solicitacao DESC, id DESC LIMIT %s;
+    """
+    try:
+        return compactar(_ler_sql(query, params + condicao[3] + [limite]))
+    except Exception as e:
+        st.error(f"Erro na busca: {e}"); return _lista_vazia()
+
+# Marca d'água da sincronização, no relógio do banco: o instante atual ou, se houver transações de escrita
+# abertas, o início da mais antiga (as linhas que ela gravar terão updated_at a partir daí, mesmo que o
+# COMMIT aconteça bem depois). Lida antes das alterações, na mesma conexão.
+QUERY_MARCA = """
+SELECT least(now(), (SELECT min(xact_start) FROM pg_stat_activity
+                     WHERE backend_xid IS NOT NULL AND pid <> pg_backend_pid() AND datname = current_database()));
+"""
+
+def marca_sincronizacao():
+    """Marca d'água atual no relógio do banco (veja QUERY_MARCA), ou None em caso de erro."""
+    try:
+        with obter_conexao() as conn:
+            with conn.cursor() as cur:
+                cur.execute(QUERY_MARCA)
+                return cur.fetchone()[0]
+    except Exception as e:
+        st.error(f"Erro ao sincronizar as alterações: {e}"); return None
+
+def fetch_alteracoes(desde, incluir_arquivo=False, **filtros):
+    """
+    Sincronização incremental: retorna (linhas alteradas desde 'desde', ids excluídos desde 'desde', nova marca).
+    A nova marca (relógio do banco, veja QUERY_MARCA) é o 'desde' da próxima chamada.
+    As linhas alteradas vêm com a coluna booleana 'corresponde', indicando se ainda atendem aos filtros,
+    para que quem as recebe saiba se deve atualizá-las ou retirá-las da lista. Não passa pelo cache.
+    Com o arquivo incluído, solicitações que só mudaram de tabela (arquivadas) não contam como excluídas.
+    """
+    tabela, arquivada = _origem(incluir_arquivo)
+    condicoes, params = _montar_filtros(**filtros)
+    corresponde = " AND ".join(condicoes) or "TRUE"
+    query = f"SELECT {COLUNAS_LISTA}, {arquivada}, ({corresponde}) AS corresponde FROM {tabela} WHERE updated_at > %s;"
+    query_excluidos = "SELECT DISTINCT id FROM solicitacoes_excluidas e WHERE excluido_em > %s"
+    if incluir_arquivo:
+        query_excluidos += " AND NOT EXISTS (SELECT 1 FROM solicitacoes_arquivo a WHERE a.id = e.id)"
+    try:
+        with obter_conexao() as conn:
+            with conn.cursor() as cur:
+                cur.execute(QUERY_MARCA)
+                marca = cur.fetchone()[0]
+            alteradas = compactar(pd.read_sql(query, conn, params=params + [desde]))
+            with conn.cursor() as cur:
+                cur.execute(query_excluidos + ";", (desde,))
+                excluidos = [linha[0] for linha in cur.fetchall()]
+            conn.rollback()
+        return alteradas, excluidos, marca
+    except Exception as e:
+        st.error(f"Erro ao sincronizar as alterações: {e}"); return None, [], desde
+
+def fetch_solicitacao(id_solicitacao):
+    """
+    Todas as colunas de uma solicitação (para imprimir o formulário), como dicionário.
+    Retorna None se ela não existe mais ou em caso de erro.
+    """
+    try:
+        # Pela visão com o arquivo: uma solicitação arquivada também pode ser impressa
+        df = _ler_sql(f"SELECT {COLUNAS_SOLICITACAO} FROM solicitacoes_com_arquivo WHERE id = %s;", [int(id_solicitacao)])
+    except Exception as e:
+        st.error(f"Erro ao buscar a solicitação: {e}"); return None
+    return None if df.empty else df.iloc[0].to_dict()
+
+def contar_solicitacoes(incluir_arquivo=False, **filtros):
+    tabela, _ = _origem(incluir_arquivo)
+    condicoes, params = _montar_filtros(**filtros)
+    try:
+        df = _ler_sql(f"SELECT count(*) AS total FROM {tabela} {_clausula_where(condicoes)};", params)
+        return int(df['total'].iloc[0])
+    except Exception as e:
+        st.error(f"Erro ao contar solicitações: {e}"); return 0
+
+def fetch_opcoes_filtro(incluir_arquivo=False):
+    """
+    Retorna (lista de status distintos, data mínima, data máxima) sem ler a tabela inteira:
+    os status saem de uma varredura com saltos no índice de status e as datas das pontas do índice de data.
+    """
+    tabela, _ = _origem(incluir_arquivo)
+    query_status = f"""
+    WITH RECURSIVE distintos AS (
+        (SELECT status FROM {tabela} WHERE status IS NOT NULL ORDER BY status LIMIT 1)
+        UNION ALL
+        SELECT (SELECT s.status FROM {tabela} s WHERE s.status > d.status ORDER BY s.status LIMIT 1)
+        FROM distintos d WHERE d.status IS NOT NULL
+    )
+    SELECT status FROM distintos WHERE status IS NOT NULL;
+    """
+    try:
+        status = _ler_sql(query_status, [])['status'].tolist()
+        datas = _ler_sql(f"SELECT min(data_solicitacao) AS data_min, max(data_solicitacao) AS data_max FROM {tabela};", [])
+        data_min, data_max = (None if pd.isna(d) else pd.Timestamp(d).to_pydatetime() for d in datas.iloc[0])
+        return status, data_min, data_max
+    except Exception as e:
+        st.error(f"Erro ao buscar as opções de filtro: {e}"); return [], None, None
+
+def delete_solicitacao(id_para_excluir):
+    try:
+        with obter_conexao() as conn:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM solicitacoes WHERE id = %s;", (id_para_excluir,))
+            conn.commit()
+        invalidar_cache()
+        return True
+    except Exception as e:
+        st.error(f"Erro ao excluir a solicitação: {e}"); return False
+
+def update_status(id_para_atualizar, novo_status):
+    try:
+        with obter_conexao() as conn:
+            with conn.cursor() as cur:
+                cur.execute("UPDATE solicitacoes SET status = %s WHERE id = %s;", (novo_status, id_para_atualizar))
+            conn.commit()
+        invalidar_cache()
+        return True
+    except Exception as e:
+        st.error(f"Erro ao atualizar o status: {e}"); return False
+
+def atualizar_status_em_lote(alteracoes):
+    """
+    Aplica várias mudanças de status numa única transação, com um só UPDATE ... FROM (VALUES ...).
+    'alteracoes' é uma lista de (id, novo_status, updated_at lido na tela). Só são atualizadas as linhas
+    que ninguém alterou desde a leitura; as demais são devolvidas como conflitos.
+    Retorna (ids_atualizados, ids_em_conflito) ou None em caso de erro.
+    """
+    query = """
+    UPDATE solicitacoes AS s SET status = v.status
+    FROM (VALUES %s) AS v(id, status, versao)
+    WHERE s.id = v.id AND s.updated_at = v.versao
+    RETURNING s.id;
+    """
+    try:
+        with obter_conexao() as conn:
+            with conn.cursor() as cur:
+                linhas = execute_values(cur, query, alteracoes, template="(%s, %s, %s::timestamptz)",
+                                        page_size=max(len(alteracoes), 1), fetch=True)
+            conn.commit()
+        invalidar_cache()
+        atualizados = {linha[0] for linha in linhas}
+        conflitos = [id_ for id_, _, _ in alteracoes if id_ not in atualizados]
+        return sorted(atualizados), conflitos
+    except Exception as e:
+        st.error(f"Erro ao atualizar os status: {e}"); return None
+
+# --- ARQUIVAMENTO ---
+def arquivar_lote(dias, tamanho_lote=500):
+    """
+    Move para o arquivo um lote de solicitações encerradas sem alteração há mais de 'dias' dias, numa
+    transação curta. Retorna a quantidade movida (0 = nada mais a arquivar). Lança a exceção em caso
+    de erro (usada pela linha de comando, manutencao.py).
+    """
+    with obter_conexao() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT arquivar_solicitacoes(%s, %s);", (dias, tamanho_lote))
+            movidas = cur.fetchone()[0]
+        conn.commit()
+    return movidas
+
+def recalcular_resumo():
+    """Reconstrói o resumo do painel a partir das tabelas (conferência manual). Lança a exceção em caso de erro."""
+    with obter_conexao() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT recalcular_resumo_solicitacoes();")
+            cur.execute("SELECT recalcular_resumo_manutencao();")
+        conn.commit()
+    invalidar_cache()
+
+# --- PAINEL (TABELAS DE RESUMO) ---
+# Todas as consultas do painel leem as tabelas de resumo mantidas pelos gatilhos (sql/006_painel.sql):
+# o custo não cresce com a tabela de solicitações e nenhuma linha individual chega ao pandas.
+DIMENSOES_PAINEL = {"status": "Status", "setor_cargo": "Setor/Cargo", "modelo_equipamento": "Modelo", "centro_custo": "Centro de Custo"}
+
+def _filtros_meses(mes_inicio=None, mes_fim=None, coluna="mes"):
+    condicoes, params = [], []
+    if mes_inicio:
+        condicoes.append(f"{coluna} >= %s"); params.append(mes_inicio)
+    if mes_fim:
+        condicoes.append(f"{coluna} <= %s"); params.append(mes_fim)
+    return condicoes, params
+
+def fetch_meses_painel():
+    """Retorna (primeiro mês, último mês) com solicitações, ou (None, None)."""
+    try:
+        df = _ler_sql("SELECT min(mes) AS inicio, max(mes) AS fim FROM resumo_solicitacoes WHERE solicitacoes > 0;", [])
+        inicio, fim = df.iloc[0]
+        return (None, None) if pd.isna(inicio) else (inicio, fim)
+    except Exception as e:
+        st.error(f"Erro ao buscar o período do painel: {e}"); return None, None
+
+def fetch_resumo(dimensao=None, por_mes=False, mes_inicio=None, mes_fim=None):
+    """
+    Totais (solicitacoes, itens, valor_total) agrupados por 'dimensao' (chave de DIMENSOES_PAINEL ou None)
+    e, se 'por_mes', também por mês. Retorna um DataFrame (vazio em caso de erro).
+    """
+    if dimensao is not None and dimensao not in DIMENSOES_PAINEL:
+        raise ValueError(f"Dimensão desconhecida: {dimensao}")
+    grupos = (["mes"] if por_mes else []) + ([dimensao] if dimensao else [])
+    condicoes, params = _filtros_meses(mes_inicio, mes_fim)
+    selecao = ", ".join(grupos + ["sum(solicitacoes)::bigint AS solicitacoes", "sum(itens)::bigint AS itens",
+                                  "sum(valor_total)::float8 AS valor_total"])
+    query = f"SELECT {selecao} FROM resumo_solicitacoes {_clausula_where(condicoes)}"
+    if grupos:
+        query += f" GROUP BY {', '.join(grupos)} HAVING sum(solicitacoes) > 0 ORDER BY {', '.join(grupos)}"
+    try:
+        return _ler_sql(query + ";", params)
+    except Exception as e:
+        st.error(f"Erro ao carregar o resumo do painel: {e}"); return pd.DataFrame()
+
+def fetch_tempo_manutencao(mes_inicio=None, mes_fim=None):
+    """
+    Tempo em "Em Manutenção": por mês de conclusão das manutenções encerradas (DataFrame mes, intervalos,
+    horas_total, horas_media) e das que estão em andamento agora (dicionário quantidade, horas_media).
+    Solicitações excluídas durante a manutenção não entram (sql/008).
+    Retorna (df, em_andamento) ou (DataFrame vazio, None) em caso de erro.
+    """
+    condicoes, params = _filtros_meses(mes_inicio, mes_fim)
+    query_encerradas = f"""
+    SELECT mes, intervalos, (segundos / 3600)::float8 AS horas_total, (segundos / 3600 / intervalos)::float8 AS horas_media
+    FROM resumo_manutencao {_clausula_where(condicoes + ["intervalos > 0"])} ORDER BY mes;
+    """
+    query_em_andamento = """
+    SELECT count(*) AS quantidade, coalesce(avg(extract(epoch FROM now() - inicio)) / 3600, 0)::float8 AS horas_media
+    FROM historico_status WHERE status = 'Em Manutenção' AND fim IS NULL;
+    """
+    try:
+        em_andamento = _ler_sql(query_em_andamento, []).iloc[0]
+        return _ler_sql(query_encerradas, params), {"quantidade": int(em_andamento['quantidade']),
+                                                    "horas_media": float(em_andamento['horas_media'])}
+    except Exception as e:
+        st.error(f"Erro ao carregar o tempo de manutenção: {e}"); return pd.DataFrame(), None
@@ -0,0 +1,218 @@
+# envio.py
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+import streamlit as st
+from tenacity import retry, retry_if_not_exception_type, stop_after_attempt, wait_exponential
+from db import inserir_solicitacoes
+from imagens import enviar_foto_preparada
+
+logger = logging.getLogger(__name__)
+
+# --- FILA DE ENVIO (CAIXA DE SAÍDA) ---
+# Cada envio do formulário é gravado primeiro num arquivo SQLite local e confirmado ao usuário na hora.
+# Uma thread em segundo plano sobe as fotos e grava as solicitações no PostgreSQL, em lotes e com novas
+# tentativas; se o banco estiver fora do ar, os envios esperam no arquivo (sobrevivem a reinícios).
+CAMINHO_CAIXA_SAIDA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados", "caixa_de_saida.sqlite3")
+TAMANHO_LOTE = 50
+ESPERA_RAJADA = 0.5        # segundos aguardando outros envios chegarem antes de gravar o lote
+INTERVALO_VERIFICACAO = 10  # segundos entre varreduras da caixa de saída sem novos envios
+ESPERA_MAXIMA = 300        # teto do intervalo entre novas tentativas de um envio que falhou
+TEMPO_RESERVA = 120        # um lote reservado por um processo volta à fila se não for concluído nesse prazo
+MAX_TENTATIVAS = 10        # recusas do banco por causa dos dados; depois disso o envio sai da fila marcado como falho
+RETENCAO_CONFIRMADOS = 7 * 24 * 3600  # segundos que um envio confirmado continua no arquivo (para a situação na página)
+INTERVALO_LIMPEZA = 3600
+
+PENDENTE, CONFIRMADO, FALHOU = "pendente", "confirmado", "falhou"
+# Só estes erros dependem do conteúdo do envio. Banco ou Cloudinary fora do ar (OperationalError, PoolError,
+# falha de rede no upload) não contam para o limite: o envio espera o tempo que for preciso.
+ERROS_DE_DADOS = (psycopg2.DataError, psycopg2.IntegrityError)
+
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, max=10), reraise=True)
+def _enviar_foto(conteudo):
+    return enviar_foto_preparada(conteudo)
+
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, max=10), retry=retry_if_not_exception_type(ERROS_DE_DADOS),
+       reraise=True)
+def _inserir(registros):
+    inserir_solicitacoes(registros)
+
+class FilaDeEnvio:
+    def __init__(self, caminho=CAMINHO_CAIXA_SAIDA, trabalhadores_upload=4):
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        self._caminho = caminho
+        self._acordar = threading.Event()
+        self._uploads = ThreadPoolExecutor(max_workers=trabalhadores_upload, thread_name_prefix="upload-foto")
+        with self._conectar() as conn:
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS envios (
+                    id_envio TEXT PRIMARY KEY, criado_em REAL NOT NULL, dados TEXT NOT NULL, foto BLOB,
+                    url_imagem TEXT, url_miniatura TEXT, status TEXT NOT NULL, tentativas INTEGER NOT NULL DEFAULT 0,
+                    ultimo_erro TEXT, proxima_tentativa REAL NOT NULL DEFAULT 0, reservado_ate REAL NOT NULL DEFAULT 0
+                );
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_envios_status ON envios (status, proxima_tentativa);")
+        threading.Thread(target=self._executar, name="fila-de-envio", daemon=True).start()
+
+    @contextmanager
+    def _conectar(self):
+        # Uma conexão por operação, em modo autocommit: o SQLite não compartilha conexões entre threads
+        conn = sqlite3.connect(self._caminho, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    # --- API USADA PELAS PÁGINAS ---
+    def enfileirar(self, dados, foto=None):
+        """
+        Grava o envio na caixa de saída e retorna seu id_envio. 'dados' usa os nomes de coluna do banco;
+        'foto' são os bytes já preparados (imagens.preparar_foto) ou None.
+        """
+        id_envio = str(uuid.uuid4())
+        dados = dict(dados, data_solicitacao=dados["data_solicitacao"].isoformat())
+        with self._conectar() as conn:
+            conn.execute("INSERT INTO envios (id_envio, criado_em, dados, foto, status) VALUES (?, ?, ?, ?, ?);",
+                         (id_envio, time.time(), json.dumps(dados), foto, PENDENTE))
+        self._acordar.set()
+        return id_envio
+
+    def situacao(self, ids_envio):
+        """Retorna {id_envio: {'status', 'tentativas', 'ultimo_erro'}} dos envios informados."""
+        if not ids_envio:
+            return {}
+        marcadores = ", ".join("?" * len(ids_envio))
+        with self._conectar() as conn:
+            linhas = conn.execute(f"SELECT id_envio, status, tentativas, ultimo_erro FROM envios WHERE id_envio IN ({marcadores});",
+                                  list(ids_envio)).fetchall()
+        return {linha["id_envio"]: dict(linha) for linha in linhas}
+
+    def pendentes(self):
+        with self._conectar() as conn:
+            return conn.execute("SELECT count(*) FROM envios WHERE status = ?;", (PENDENTE,)).fetchone()[0]
+
+    # --- PROCESSAMENTO EM SEGUNDO PLANO ---
+    def _reservar_lote(self):
+        agora = time.time()
+        with self._conectar() as conn:
+            conn.execute("BEGIN IMMEDIATE;")
+            linhas = conn.execute("""
+                SELECT * FROM envios WHERE status = ? AND proxima_tentativa <= ? AND reservado_ate <= ?
+                ORDER BY criado_em LIMIT ?;
+            """, (PENDENTE, agora, agora, TAMANHO_LOTE)).fetchall()
+            if linhas:
+                marcadores = ", ".join("?" * len(linhas))
+                conn.execute(f"UPDATE envios SET reservado_ate = ? WHERE id_envio IN ({marcadores});",
+                             [agora + TEMPO_RESERVA] + [linha["id_envio"] for linha in linhas])
+            conn.execute("COMMIT;")
+        return linhas
+
+    def _registrar_falha(self, ids_envio, erro):
+        with self._conectar() as conn:
+            for id_envio in ids_envio:
+                tentativas = conn.execute("SELECT tentativas FROM envios WHERE id_envio = ?;", (id_envio,)).fetchone()[0] + 1
+                # Recusado pelos dados tantas vezes, o envio não volta mais à fila (e não trava os demais)
+                status = FALHOU if isinstance(erro, ERROS_DE_DADOS) and tentativas >= MAX_TENTATIVAS else PENDENTE
+                if status == FALHOU:
+                    logger.error("Envio %s descartado após %s tentativas: %s", id_envio, tentativas, erro)
+                conn.execute("UPDATE envios SET status = ?, tentativas = ?, ultimo_erro = ?, proxima_tentativa = ?, reservado_ate = 0 "
+                             "WHERE id_envio = ?;",
+                             (status, tentativas, str(erro)[:500], time.time() + min(2 ** tentativas, ESPERA_MAXIMA), id_envio))
+
+    def _confirmar(self, ids_envio):
+        marcadores = ", ".join("?" * len(ids_envio))
+        with self._conectar() as conn:
+            # Confirmado: a foto não precisa mais ficar guardada localmente
+            conn.execute(f"UPDATE envios SET status = ?, foto = NULL, ultimo_erro = NULL WHERE id_envio IN ({marcadores});",
+                         [CONFIRMADO] + list(ids_envio))
+
+    def _limpar_confirmados(self):
+        with self._conectar() as conn:
+            removidos = conn.execute("DELETE FROM envios WHERE status = ? AND criado_em < ?;",
+                                     (CONFIRMADO, time.time() - RETENCAO_CONFIRMADOS)).rowcount
+        if removidos:
+            logger.info("Caixa de saída: %s envio(s) confirmado(s) antigo(s) removido(s).", removidos)
+
+    def _subir_fotos(self, linhas):
+        """Sobe em paralelo as fotos ainda não enviadas. Retorna as linhas prontas para o INSERT."""
+        sem_url = [linha for linha in linhas if linha["foto"] is not None and linha["url_imagem"] is None]
+        futuros = {linha["id_envio"]: self._uploads.submit(_enviar_foto, linha["foto"]) for linha in sem_url}
+        prontas = []
+        for linha in linhas:
+            registro = dict(linha)
+            futuro = futuros.get(linha["id_envio"])
+            if futuro is not None:
+                try:
+                    registro["url_imagem"], registro["url_miniatura"] = futuro.result()
+                except Exception as e:
+                    self._registrar_falha([linha["id_envio"]], f"Falha ao enviar a foto: {e}"); continue
+                # A URL fica guardada: uma falha no banco depois disso não repete o upload
+                with self._conectar() as conn:
+                    conn.execute("UPDATE envios SET url_imagem = ?, url_miniatura = ? WHERE id_envio = ?;",
+                                 (registro["url_imagem"], registro["url_miniatura"], linha["id_envio"]))
+            prontas.append(registro)
+        return prontas
+
+    def _processar_lote(self, linhas):
+        prontas = self._subir_fotos(linhas)
+        if not prontas:
+            return
+        registros = []
+        for linha in prontas:
+            dados = json.loads(linha["dados"])
+            dados.update(id_envio=linha["id_envio"], url_imagem=linha["url_imagem"], url_miniatura=linha["url_miniatura"],
+                         data_solicitacao=datetime.fromisoformat(dados["data_solicitacao"]))
+            registros.append(dados)
+        ids_envio = [linha["id_envio"] for linha in prontas]
+        try:
+            _inserir(registros)
+        except Exception as e:
+            logger.warning("Falha ao gravar %s envio(s) no banco: %s", len(registros), e)
+            if len(registros) == 1 or not isinstance(e, ERROS_DE_DADOS):
+                self._registrar_falha(ids_envio, e); return
+            # O banco recusou o lote por causa de alguma linha: grava um por um, para que ela não segure as outras
+            confirmados = []
+            for id_envio, registro in zip(ids_envio, registros):
+                try:
+                    inserir_solicitacoes([registro])
+                except Exception as erro:
+                    self._registrar_falha([id_envio], erro)
+                else:
+                    confirmados.append(id_envio)
+            if confirmados:
+                self._confirmar(confirmados)
+            return
+        self._confirmar(ids_envio)
+
+    def _executar(self):
+        ultima_limpeza = 0.0
+        while True:
+            if self._acordar.wait(timeout=INTERVALO_VERIFICACAO):
+                time.sleep(ESPERA_RAJADA)
+                self._acordar.clear()
+            try:
+                if time.time() - ultima_limpeza > INTERVALO_LIMPEZA:
+                    self._limpar_confirmados(); ultima_limpeza = time.time()
+                while True:
+                    linhas = self._reservar_lote()
+                    if not linhas:
+                        break
+                    self._processar_lote(linhas)
+            except Exception as e:
+                logger.exception("Erro inesperado na fila de envio: %s", e)
+
+@st.cache_resource
+def get_fila():
+    return FilaDeEnvio()
@@ -0,0 +1,140 @@
+# exportacao.py
+
+import os
+import time
+import tempfile
+from functools import lru_cache
+
+from db import obter_conexao, consulta_exportacao, cursor_servidor
+
+# --- EXPORTAÇÃO DE RELATÓRIOS EM FLUXO ---
+# As linhas saem do banco por um cursor do servidor, em lotes, e vão direto para um arquivo temporário:
+# a memória usada não cresce com o tamanho do relatório.
+TAMANHO_LOTE = 2000
+AMOSTRA_LARGURAS = 500  # linhas usadas para estimar a largura das colunas no Excel
+LARGURA_MAXIMA = 60
+LIMITE_LINHAS_XLSX = 1_048_576 - 1  # limite de linhas de uma planilha do Excel, menos o cabeçalho
+PREFIXO_TEMPORARIOS = ("relatorio_solicitacoes_", "formularios_")
+IDADE_MAXIMA_TEMPORARIOS = 6 * 3600  # segundos; arquivos mais antigos são de sessões que já foram embora
+
+FORMATOS = {
+    "Excel (.xlsx)": {"extensao": "xlsx", "mime": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"},
+    "CSV (.csv)": {"extensao": "csv", "mime": "text/csv"},
+    "Parquet (.parquet)": {"extensao": "parquet", "mime": "application/vnd.apache.parquet"},
+}
+
+# xlsxwriter e pyarrow.parquet são importados só quando um relatório nesse formato é gerado
+@lru_cache(maxsize=1)
+def esquema_parquet():
+    import pyarrow as pa
+    return pa.schema([
+        ("id", pa.int64()), ("data_solicitacao", pa.timestamp("us")), ("solicitante", pa.string()),
+        ("setor_cargo", pa.string()), ("modelo_equipamento", pa.string()), ("descricao_equipamento", pa.string()),
+        ("codigo_equipamento", pa.string()), ("sistema_alocado", pa.string()), ("quantidade", pa.int64()),
+        ("centro_custo", pa.string()), ("valor", pa.float64()), ("motivo_envio", pa.string()),
+        ("url_imagem", pa.string()), ("status", pa.string()),
+    ])
+
+def _lotes(cur):
+    while True:
+        linhas = cur.fetchmany(TAMANHO_LOTE)
+        if not linhas:
+            return
+        yield linhas
+
+def _larguras(colunas, amostra):
+    larguras = [len(col) for col in colunas]
+    for linha in amostra:
+        for i, valor in enumerate(linha):
+            if valor is not None:
+                larguras[i] = max(larguras[i], len(str(valor)))
+    return [min(largura, LARGURA_MAXIMA) + 2 for largura in larguras]
+
+def _encadear(primeiro, lotes):
+    if primeiro:
+        yield primeiro
+    yield from lotes
+
+def exportar_xlsx(destino, **filtros):
+    import xlsxwriter
+    query, params = consulta_exportacao(**filtros)
+    workbook = xlsxwriter.Workbook(destino, {'constant_memory': True, 'default_date_format': 'dd/mm/yyyy hh:mm:ss'})
+    worksheet = workbook.add_worksheet('RelatorioSolicitacoes')
+    total = 0
+    try:
+        with cursor_servidor(query, params, itersize=TAMANHO_LOTE) as cur:
+            lotes = _lotes(cur)
+            primeiro = next(lotes, [])
+            colunas = [desc[0] for desc in cur.description]
+            for i, largura in enumerate(_larguras(colunas, primeiro[:AMOSTRA_LARGURAS])):
+                worksheet.set_column(i, i, largura)
+            worksheet.write_row(0, 0, colunas)
+            # No modo constant_memory cada linha é gravada em disco assim que a próxima começa
+            for linhas in _encadear(primeiro, lotes):
+                for linha in linhas:
+                    total += 1
+                    if total > LIMITE_LINHAS_XLSX:
+                        # O xlsxwriter descartaria as linhas excedentes sem avisar
+                        raise ValueError(f"O Excel comporta até {LIMITE_LINHAS_XLSX} linhas; use CSV ou Parquet.")
+                    worksheet.write_row(total, 0, linha)
+    finally:
+        workbook.close()
+    return total
+
+def exportar_csv(destino, **filtros):
+    # O próprio PostgreSQL formata o CSV (COPY), sem passar as linhas pelo Python
+    query, params = consulta_exportacao(**filtros)
+    with obter_conexao() as conn:
+        with conn.cursor() as cur:
+            comando = cur.mogrify(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER true)", params).decode()
+            with open(destino, "wb") as arquivo:
+                arquivo.write("\ufeff".encode("utf-8"))  # BOM: o Excel abre acentos corretamente
+                cur.copy_expert(comando, arquivo)
+                return cur.rowcount
+
+def exportar_parquet(destino, **filtros):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    query, params = consulta_exportacao(**filtros)
+    esquema, total = esquema_parquet(), 0
+    with pq.ParquetWriter(destino, esquema, compression="zstd") as writer:
+        with cursor_servidor(query, params, itersize=TAMANHO_LOTE) as cur:
+            for linhas in _lotes(cur):
+                colunas = list(zip(*linhas))
+                writer.write_batch(pa.record_batch([pa.array(valores, type=campo.type)
+                                                    for valores, campo in zip(colunas, esquema)], schema=esquema))
+                total += len(linhas)
+    return total
+
+EXPORTADORES = {"xlsx": exportar_xlsx, "csv": exportar_csv, "parquet": exportar_parquet}
+
+def limpar_temporarios(idade_maxima=IDADE_MAXIMA_TEMPORARIOS):
+    """
+    Apaga relatórios e lotes de formulários temporários mais antigos que 'idade_maxima' segundos: os de
+    sessões abandonadas não seriam apagados pela própria sessão. Retorna quantos arquivos foram removidos.
+    """
+    pasta, limite, removidos = tempfile.gettempdir(), time.time() - idade_maxima, 0
+    for nome in os.listdir(pasta):
+        if not nome.startswith(PREFIXO_TEMPORARIOS):
+            continue
+        caminho = os.path.join(pasta, nome)
+        try:
+            if os.path.getmtime(caminho) < limite:
+                os.remove(caminho); removidos += 1
+        except OSError:
+            pass  # removido por outro processo ou ainda em uso
+    return removidos
+
+def exportar(formato, **filtros):
+    """
+    Gera o relatório no formato pedido (chave de FORMATOS) num arquivo temporário.
+    Retorna (caminho do arquivo, número de linhas); quem chama apaga o arquivo quando não precisar mais.
+    """
+    extensao = FORMATOS[formato]["extensao"]
+    limpar_temporarios()
+    descritor, caminho = tempfile.mkstemp(suffix=f".{extensao}", prefix="relatorio_solicitacoes_")
+    os.close(descritor)
+    try:
+        return caminho, EXPORTADORES[extensao](caminho, **filtros)
+    except Exception:
+        os.remove(caminho); raise
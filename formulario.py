@@ -0,0 +1,183 @@
+# formulario.py
+
+import os
+import re
+import zipfile
+import multiprocessing
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from functools import lru_cache
+
+# --- LAYOUT DO FORMULÁRIO DE ENVIO ---
+# Tudo o que não depende da solicitação é definido (ou lido do disco) uma única vez por processo;
+# cada formulário só preenche os campos. Não depende do Streamlit: serve às páginas e a rotinas em lote.
+# xlsxwriter e PIL são importados no primeiro formulário gerado, não ao abrir a página.
+CAMINHO_LOGO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "logo.png")
+TAMANHO_LOGO_PX = (159, 57)  # largura, altura desejadas no cabeçalho
+TITULO = 'FORMULÁRIO DE ENVIO PARA ASSISTÊNCIA TÉCNICA'
+CODIGO_DOCUMENTO, VERSAO_DOCUMENTO = 'F00000', 'Ver:00'
+LARGURAS_COLUNAS = (('A:A', 30), ('B:C', 50), ('D:D', 10))
+MIME_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+FORMATOS = {
+    "cabecalho": {'bold': True, 'font_size': 16, 'align': 'center', 'valign': 'vcenter', 'border': 1},
+    "codigo": {'font_size': 10, 'align': 'center', 'valign': 'vcenter', 'border': 1},
+    "titulo": {'bold': True, 'font_size': 11, 'align': 'left', 'valign': 'vcenter'},
+    "dados": {'font_size': 11, 'align': 'left', 'valign': 'vcenter', 'border': 1, 'text_wrap': True},
+    "moeda": {'num_format': 'R$ #,##0.00', 'font_size': 11, 'align': 'left', 'valign': 'vcenter', 'border': 1},
+    "centro": {'align': 'center'},
+}
+
+@lru_cache(maxsize=1)
+def _logo():
+    """
+    Retorna (bytes do logo, escala_x, escala_y), lidos uma vez por processo, ou None se não houver logo.
+    """
+    try:
+        with open(CAMINHO_LOGO, "rb") as f:
+            conteudo = f.read()
+    except FileNotFoundError:
+        return None
+    from PIL import Image
+    with Image.open(BytesIO(conteudo)) as img:
+        largura_original_px, altura_original_px = img.size
+    return conteudo, TAMANHO_LOGO_PX[0] / largura_original_px, TAMANHO_LOGO_PX[1] / altura_original_px
+
+def criar_formatos(workbook):
+    """Os formatos pertencem a um workbook: crie uma vez por arquivo e reutilize entre as abas."""
+    return {nome: workbook.add_format(propriedades) for nome, propriedades in FORMATOS.items()}
+
+def escrever_formulario(workbook, worksheet, dados, formatos=None):
+    """
+    Desenha o formulário numa aba já criada. 'dados' é o dicionário rótulo -> valor (veja dados_formulario).
+    """
+    formatos = formatos or criar_formatos(workbook)
+    worksheet.merge_range('A1:A2', '', formatos["cabecalho"])
+    logo = _logo()
+    if logo:
+        conteudo, escala_x, escala_y = logo
+        worksheet.insert_image('A1', 'logo.png', {'image_data': BytesIO(conteudo), 'x_scale': escala_x, 'y_scale': escala_y, 'object_position': 1})
+    else:
+        worksheet.write('A1', 'Logo')
+
+    worksheet.merge_range('B1:C2', TITULO, formatos["cabecalho"])
+    worksheet.write('D1', CODIGO_DOCUMENTO, formatos["codigo"])
+    worksheet.write('D2', VERSAO_DOCUMENTO, formatos["codigo"])
+    worksheet.set_row(0, 35); worksheet.set_row(1, 35)
+
+    row = 2
+    for campo, valor_dado in dados.items():
+        worksheet.write(row, 0, campo, formatos["titulo"])
+        if campo == "Valor":
+            worksheet.merge_range(row, 1, row, 3, valor_dado, formatos["moeda"])
+        else:
+            worksheet.merge_range(row, 1, row, 3, str(valor_dado), formatos["dados"])
+        worksheet.set_row(row, 30)
+        row += 1
+
+    for colunas, largura in LARGURAS_COLUNAS:
+        worksheet.set_column(colunas, largura)
+
+    row += 2
+    worksheet.merge_range(row, 0, row, 3, '_________________________________________', formatos["centro"])
+    row += 1
+    worksheet.merge_range(row, 0, row, 3, 'Assinatura do Solicitante', formatos["centro"])
+
+def gerar_excel_formulario(dados):
+    """Gera o arquivo .xlsx de um formulário e retorna seus bytes."""
+    import xlsxwriter
+    output = BytesIO()
+    workbook = xlsxwriter.Workbook(output, {'in_memory': True})
+    escrever_formulario(workbook, workbook.add_worksheet('Solicitacao'), dados)
+    workbook.close()
+    return output.getvalue()
+
+def _ou(valor, padrao):
+    # Trata None e NaN (linhas vindas do pandas) como "não informado"
+    return padrao if valor is None or valor != valor or valor == "" else valor
+
+def dados_formulario(registro):
+    """
+    Monta os campos do formulário a partir de uma solicitação com os nomes de coluna do banco
+    (dicionário ou linha do pandas).
+    """
+    data = registro['data_solicitacao']
+    return {
+        "Data da Solicitação": data.strftime('%d/%m/%Y %H:%M:%S') if isinstance(data, datetime) else str(data),
+        "Solicitante": registro['solicitante'], "Setor/Cargo": registro['setor_cargo'],
+        "Modelo do Equipamento": registro['modelo_equipamento'],
+        "Descrição do Equipamento": _ou(registro['descricao_equipamento'], "Não informado"),
+        "Código do Equipamento": registro['codigo_equipamento'], "Sistema Alocado": registro['sistema_alocado'],
+        "Quantidade": registro['quantidade'], "Centro de Custo": _ou(registro['centro_custo'], "Não informado"),
+        "Valor": float(_ou(registro['valor'], 0.0)), "Motivo do Envio": registro['motivo_envio']
+    }
+
+def nome_arquivo_formulario(registro):
+    return f"solicitacao_{registro['solicitante'].split(' ')[0]}_{registro['data_solicitacao'].strftime('%Y%m%d')}.xlsx"
+
+# --- IMPRESSÃO EM LOTE ---
+def _renderizar(item):
+    # Executada nos processos do pool: precisa ficar no nível do módulo para ser serializável
+    nome, dados = item
+    return nome, gerar_excel_formulario(dados)
+
+def gerar_zip_formularios(itens, destino, trabalhadores=None, ao_progredir=None):
+    """
+    Gera um .zip com um .xlsx por solicitação. 'itens' é um iterável de (nome do arquivo, dados do formulário),
+    consumido aos poucos: os formulários são renderizados em paralelo num pool de processos, com no máximo
+    2 por processo em andamento, e cada um vai para o zip assim que fica pronto (memória limitada).
+    'ao_progredir(quantidade_pronta)' é chamada a cada formulário concluído. Retorna a quantidade gerada.
+    """
+    trabalhadores = trabalhadores or max(1, min(4, os.cpu_count() or 1))
+    itens = iter(itens)
+    prontos = 0
+    # 'spawn' evita copiar para os filhos o estado (threads, conexões) do processo do servidor
+    with ProcessPoolExecutor(max_workers=trabalhadores, mp_context=multiprocessing.get_context("spawn")) as pool, \
+         zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_DEFLATED) as arquivo_zip:
+        em_andamento = set()
+        while True:
+            for item in itens:
+                em_andamento.add(pool.submit(_renderizar, item))
+                if len(em_andamento) >= 2 * trabalhadores:
+                    break
+            if not em_andamento:
+                return prontos
+            concluidos, em_andamento = wait(em_andamento, return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                nome, conteudo = futuro.result()
+                arquivo_zip.writestr(nome, conteudo)
+                prontos += 1
+                if ao_progredir:
+                    ao_progredir(prontos)
+
+def nome_aba(texto, usados):
+    """Nome de aba válido no Excel (até 31 caracteres, sem []:*?/\\) e único no workbook."""
+    base = re.sub(r"[\[\]:*?/\\]", "-", str(texto))[:31] or "Solicitacao"
+    nome, sufixo = base, 1
+    while nome.lower() in usados:
+        sufixo += 1
+        nome = f"{base[:31 - len(str(sufixo)) - 1]}~{sufixo}"
+    usados.add(nome.lower())
+    return nome
+
+def gerar_workbook_formularios(itens, destino, ao_progredir=None):
+    """
+    Gera um único .xlsx com uma aba por solicitação. 'itens' é um iterável de (nome da aba, dados).
+    Um workbook só pode ser escrito por um processo, então aqui a renderização é sequencial; os formatos
+    e o logo (que o xlsxwriter grava uma vez só) são compartilhados entre as abas.
+    Retorna a quantidade de abas geradas.
+    """
+    import xlsxwriter
+    workbook = xlsxwriter.Workbook(destino)
+    formatos = criar_formatos(workbook)
+    usados, prontos = set(), 0
+    try:
+        for nome, dados in itens:
+            escrever_formulario(workbook, workbook.add_worksheet(nome_aba(nome, usados)), dados, formatos)
+            prontos += 1
+            if ao_progredir:
+                ao_progredir(prontos)
+    finally:
+        workbook.close()
+    return prontos
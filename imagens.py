@@ -0,0 +1,67 @@
+# imagens.py
+
+from io import BytesIO
+from functools import lru_cache
+
+import streamlit as st
+
+# --- PRÉ-PROCESSAMENTO E ENVIO DE FOTOS ---
+# A foto da câmera é girada conforme o EXIF, reduzida e recomprimida antes do envio:
+# sobe bem menos dados e a listagem usa uma miniatura servida pelo próprio Cloudinary.
+LADO_MAXIMO_PX = 1600
+FORMATO_FOTO, QUALIDADE_FOTO = "WEBP", 80
+LARGURA_MINIATURA_PX = 140  # o dobro da largura exibida na lista, para telas de alta densidade
+PASTA_CLOUDINARY = "solicitacoes_manutencao"
+
+# PIL e cloudinary são importados só por quem prepara ou envia fotos: as páginas que só
+# exibem miniaturas (url_miniatura) não pagam esse custo na inicialização.
+def credenciais_cloudinary():
+    """Credenciais da seção [cloudinary] do secrets.toml. Lança KeyError se faltar alguma."""
+    secao = st.secrets["cloudinary"]
+    return {"cloud_name": secao["cloud_name"], "api_key": secao["api_key"], "api_secret": secao["api_secret"]}
+
+@lru_cache(maxsize=1)
+def _uploader():
+    # Configurado uma vez por processo, na primeira foto enviada
+    import cloudinary
+    import cloudinary.uploader
+    cloudinary.config(**credenciais_cloudinary())
+    return cloudinary.uploader
+
+def preparar_foto(arquivo):
+    """
+    Recebe a imagem (arquivo ou bytes) e retorna os bytes prontos para envio: orientação corrigida,
+    maior lado limitado a LADO_MAXIMO_PX e recompressão em WebP.
+    """
+    from PIL import Image, ImageOps
+    if isinstance(arquivo, (bytes, bytearray)):
+        arquivo = BytesIO(arquivo)
+    with Image.open(arquivo) as original:
+        img = ImageOps.exif_transpose(original)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGB")
+        img.thumbnail((LADO_MAXIMO_PX, LADO_MAXIMO_PX), Image.Resampling.LANCZOS)
+        saida = BytesIO()
+        img.save(saida, FORMATO_FOTO, quality=QUALIDADE_FOTO, method=4)
+    return saida.getvalue()
+
+def url_miniatura(url_imagem):
+    """
+    URL da miniatura de uma imagem do Cloudinary: a transformação vai na própria URL e o Cloudinary
+    gera e guarda em cache a versão reduzida no primeiro acesso.
+    """
+    if not url_imagem or "/upload/" not in url_imagem:
+        return url_imagem
+    return url_imagem.replace("/upload/", f"/upload/c_limit,w_{LARGURA_MINIATURA_PX},q_auto,f_auto/", 1)
+
+def enviar_foto_preparada(conteudo):
+    """
+    Envia ao Cloudinary os bytes já gerados por preparar_foto. Retorna (url da imagem, url da miniatura).
+    """
+    resultado = _uploader().upload(conteudo, folder=PASTA_CLOUDINARY, resource_type="image")
+    url = resultado.get('secure_url')
+    return url, url_miniatura(url)
+
+def enviar_foto(arquivo):
+    """Pré-processa e envia a foto ao Cloudinary. Retorna (url da imagem, url da miniatura)."""
+    return enviar_foto_preparada(preparar_foto(arquivo))
@@ -0,0 +1,142 @@
+# importacao.py
+
+import io
+import re
+import uuid
+import unicodedata
+from datetime import datetime
+
+import pandas as pd
+from db import FUSO_HORARIO, STATUS_SOLICITACAO, COLUNAS_IMPORTACAO
+
+# --- IMPORTAÇÃO EM LOTE (CSV / EXCEL) ---
+# A planilha é validada coluna a coluna com operações vetorizadas do pandas (nada de laço por linha);
+# as linhas válidas seguem para db.importar_solicitacoes (COPY + mescla) e as inválidas viram um relatório.
+OBRIGATORIAS = ("solicitante", "setor_cargo", "modelo_equipamento", "codigo_equipamento", "sistema_alocado", "motivo_envio")
+OPCIONAIS = ("data_solicitacao", "descricao_equipamento", "quantidade", "centro_custo", "valor", "status")
+STATUS_PADRAO = STATUS_SOLICITACAO[0]
+FORMATOS_DATA = ("%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y")  # além do ISO (AAAA-MM-DD ...)
+# Espaço de nomes dos id_envio das linhas importadas: o mesmo arquivo importado duas vezes gera os mesmos ids
+NAMESPACE_IMPORTACAO = uuid.UUID("0b0d5a3e-6f55-4c4e-9a43-6a1f1f0d6c21")
+
+# Cabeçalhos aceitos além dos nomes das colunas do banco: os rótulos do formulário e do relatório exportado
+SINONIMOS = {
+    "data": "data_solicitacao", "data_da_solicitacao": "data_solicitacao", "setor": "setor_cargo", "setor_cargo": "setor_cargo",
+    "modelo": "modelo_equipamento", "modelo_do_equipamento": "modelo_equipamento",
+    "descricao": "descricao_equipamento", "descricao_do_equipamento": "descricao_equipamento",
+    "codigo": "codigo_equipamento", "codigo_do_equipamento": "codigo_equipamento", "n_de_serie": "codigo_equipamento",
+    "sistema": "sistema_alocado", "centro_de_custo": "centro_custo", "motivo": "motivo_envio", "motivo_do_envio": "motivo_envio",
+}
+
+def _normalizar_cabecalho(nome):
+    sem_acento = unicodedata.normalize("NFKD", str(nome)).encode("ascii", "ignore").decode()
+    chave = re.sub(r"[^a-z0-9]+", "_", sem_acento.lower()).strip("_")
+    return SINONIMOS.get(chave, chave)
+
+def ler_planilha(conteudo, nome_arquivo):
+    """
+    Lê um .csv (vírgula ou ponto e vírgula, UTF-8 com ou sem BOM) ou .xlsx. Todas as células chegam como texto:
+    a conversão de tipos é feita (e reportada) na validação.
+    """
+    if nome_arquivo.lower().endswith(".xlsx"):
+        df = pd.read_excel(io.BytesIO(conteudo), dtype=str)
+    else:
+        primeira_linha = conteudo.split(b"\n", 1)[0]
+        separador = ";" if primeira_linha.count(b";") > primeira_linha.count(b",") else ","
+        df = pd.read_csv(io.BytesIO(conteudo), dtype=str, sep=separador, encoding="utf-8-sig", keep_default_na=False)
+    df.columns = [_normalizar_cabecalho(coluna) for coluna in df.columns]
+    return df
+
+def _texto(serie):
+    serie = serie.astype("string").str.strip()
+    return serie.mask(serie == "")
+
+# Horário com fuso explícito no fim ("...T10:00:00-03:00", "... 13:00Z"); sem ele, a data é do horário de Brasília
+_FUSO_EXPLICITO = r"\d{1,2}:\d{2}(?::\d{2}(?:\.\d+)?)?\s*(?:Z|[+-]\d{2}(?::?\d{2})?)$"
+
+def _datas(serie):
+    """
+    Converte as datas para o horário de Brasília. Valores com fuso explícito são lidos em UTC e convertidos;
+    os demais (ISO ou DD/MM/AAAA) são horário local. O que não for reconhecido vira NaT, reportado por linha.
+    """
+    com_fuso = serie.str.contains(_FUSO_EXPLICITO, case=False, regex=True, na=False).astype(bool)
+    sem_fuso = serie.notna() & ~com_fuso
+    locais = pd.to_datetime(serie.where(sem_fuso), format="ISO8601", errors="coerce")
+    for formato in FORMATOS_DATA:
+        faltando = locais.isna() & sem_fuso
+        if not faltando.any():
+            break
+        locais = locais.mask(faltando, pd.to_datetime(serie.where(faltando), format=formato, errors="coerce"))
+    datas = locais.dt.tz_localize(FUSO_HORARIO, ambiguous="NaT", nonexistent="shift_forward")
+    if com_fuso.any():
+        convertidas = pd.to_datetime(serie.where(com_fuso), format="ISO8601", utc=True, errors="coerce").dt.tz_convert(FUSO_HORARIO)
+        datas = datas.mask(com_fuso, convertidas.astype(datas.dtype))
+    return datas
+
+def _valores(serie):
+    # Aceita "1.234,56", "1234,56", "R$ 1.234,56" e "1234.56"
+    limpo = serie.str.replace(r"[R$\s]", "", regex=True)
+    decimal_com_virgula = limpo.str.contains(",", regex=False, na=False)
+    limpo = limpo.where(~decimal_com_virgula, limpo.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    return pd.to_numeric(limpo, errors="coerce")
+
+def validar(df):
+    """
+    Valida a planilha lida por ler_planilha. Retorna (validas, erros):
+    - validas: DataFrame com as colunas de db.COLUNAS_IMPORTACAO, já tipadas, pronto para importar;
+    - erros: DataFrame (linha, coluna, valor, erro), uma linha por problema; 'linha' é a da planilha (cabeçalho = 1).
+    Lança ValueError se faltar alguma coluna obrigatória no cabeçalho.
+    """
+    faltando = [coluna for coluna in OBRIGATORIAS if coluna not in df.columns]
+    if faltando:
+        raise ValueError(f"Colunas obrigatórias ausentes na planilha: {', '.join(faltando)}.")
+    df = df.reindex(columns=OBRIGATORIAS + OPCIONAIS).reset_index(drop=True)
+    bruto = {coluna: _texto(df[coluna]) for coluna in df.columns}
+    problemas = []
+
+    def marcar(mascara, coluna, erro):
+        if mascara.any():
+            problemas.append(pd.DataFrame({"linha": mascara[mascara].index + 2, "coluna": coluna,
+                                           "valor": bruto[coluna][mascara].fillna(""), "erro": erro}))
+
+    validas = pd.DataFrame({coluna: bruto[coluna] for coluna in OBRIGATORIAS + ("descricao_equipamento", "centro_custo")})
+    for coluna in OBRIGATORIAS:
+        marcar(bruto[coluna].isna(), coluna, "Campo obrigatório vazio")
+
+    informada = bruto["data_solicitacao"].notna()
+    datas = _datas(bruto["data_solicitacao"])
+    marcar(informada & datas.isna(), "data_solicitacao", "Data inválida (use DD/MM/AAAA [HH:MM[:SS]] ou AAAA-MM-DD)")
+    validas["data_solicitacao"] = datas.fillna(pd.Timestamp(datetime.now(FUSO_HORARIO)))
+
+    quantidade = pd.to_numeric(bruto["quantidade"], errors="coerce")
+    invalida = bruto["quantidade"].notna() & (quantidade.isna() | (quantidade < 1) | (quantidade % 1 != 0))
+    marcar(invalida, "quantidade", "Quantidade deve ser um número inteiro maior que zero")
+    validas["quantidade"] = quantidade.fillna(1).where(~invalida).astype("Int64")
+
+    valor = _valores(bruto["valor"])
+    marcar(bruto["valor"].notna() & (valor.isna() | (valor < 0)), "valor", "Valor deve ser um número maior ou igual a zero")
+    validas["valor"] = valor.round(2)
+
+    status_por_nome = {status.lower(): status for status in STATUS_SOLICITACAO}
+    status = bruto["status"].str.lower().map(status_por_nome)
+    marcar(bruto["status"].notna() & status.isna(), "status", f"Status deve ser um de: {', '.join(STATUS_SOLICITACAO)}")
+    validas["status"] = status.fillna(STATUS_PADRAO)
+
+    erros = (pd.concat(problemas, ignore_index=True).sort_values(["linha", "coluna"], ignore_index=True) if problemas
+             else pd.DataFrame(columns=["linha", "coluna", "valor", "erro"]))
+    validas = validas[~validas.index.isin(erros["linha"] - 2)]
+
+    # id_envio determinístico: conteúdo da linha + ordem entre linhas idênticas (não a posição na planilha).
+    # Reimportar o arquivo corrigido, mesmo com linhas incluídas ou removidas, não duplica as já gravadas.
+    conteudo = bruto[OBRIGATORIAS[0]].fillna("").str.cat([bruto[coluna] for coluna in OBRIGATORIAS[1:] + OPCIONAIS], sep="\x1f", na_rep="")
+    ocorrencia = conteudo.groupby(conteudo, sort=False).cumcount().astype(str)
+    chaves = conteudo.str.cat(ocorrencia, sep="\x1e")[validas.index]
+    validas["id_envio"] = [str(uuid.uuid5(NAMESPACE_IMPORTACAO, chave)) for chave in chaves]
+    return validas[list(COLUNAS_IMPORTACAO)], erros
+
+def modelo_csv():
+    """CSV vazio com o cabeçalho esperado, para o usuário preencher."""
+    return ("\ufeff" + ";".join(OBRIGATORIAS + OPCIONAIS) + "\n").encode("utf-8")
+
+def relatorio_erros_csv(erros):
+    return ("\ufeff" + erros.to_csv(index=False, sep=";")).encode("utf-8")
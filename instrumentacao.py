@@ -0,0 +1,105 @@
+# instrumentacao.py
+
+import re
+import json
+import time
+import logging
+import threading
+import contextvars
+from collections import deque, defaultdict
+from contextlib import ContextDecorator
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+logger = logging.getLogger("solicitacao.desempenho")
+
+# --- MEDIÇÃO POR FASE ---
+# Cada fase medida (trecho de página, consulta SQL) vira uma linha de log em JSON, entra na janela de
+# tempos do processo (percentis no painel de depuração) e, dentro de uma sessão, no detalhamento da
+# execução atual da página. Fases mais lentas que LIMITE_LENTO_MS são registradas como WARNING.
+JANELA = 500            # últimas medições guardadas por fase, para os percentis
+LIMITE_LENTO_MS = 1000
+CHAVE_SESSAO = "_desempenho"
+
+_profundidade = contextvars.ContextVar("profundidade_fase", default=0)
+# Janelas do processo num global do módulo, não em st.cache_resource: registrar também roda nas threads
+# sem sessão (fila de envio, ouvinte de alterações, manutencao.py), onde o cache do Streamlit loga um
+# aviso de "missing ScriptRunContext" a cada chamada.
+_JANELAS = {"lock": threading.Lock(), "tempos": defaultdict(lambda: deque(maxlen=JANELA))}
+
+def _estado_sessao():
+    # Fora de uma sessão (threads de fundo, linha de comando) a medição só vai para o log e a janela
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return None
+    return st.session_state.setdefault(CHAVE_SESSAO, {"atual": [], "ultima": []})
+
+def registrar(fase, ms, profundidade=None, inicio=None, **detalhes):
+    """Registra uma medição já feita (em ms). Sem 'profundidade', vale a da fase em andamento."""
+    profundidade = _profundidade.get() if profundidade is None else profundidade
+    with _JANELAS["lock"]:
+        _JANELAS["tempos"][fase].append(ms)
+    registro = {"fase": fase, "ms": round(ms, 2), "profundidade": profundidade, **detalhes}
+    estado = _estado_sessao()
+    if estado is not None:
+        # O início ordena o detalhamento: uma fase aparece antes das consultas que disparou
+        estado["atual"].append({**registro, "inicio": time.perf_counter() - ms / 1000 if inicio is None else inicio})
+    nivel = logging.WARNING if ms >= LIMITE_LENTO_MS else logging.INFO
+    if logger.isEnabledFor(nivel):
+        logger.log(nivel, json.dumps(registro, ensure_ascii=False, default=str))
+
+class fase(ContextDecorator):
+    """
+    Mede um trecho como fase 'nome'. Serve como gerenciador de contexto (with fase("consulta"): ...)
+    e como decorador (@fase("exportacao")). Detalhes extras (linhas, formato...) vão para o registro;
+    dentro do bloco, também podem ser preenchidos em 'detalhes'.
+    """
+    def __init__(self, nome, **detalhes):
+        self.nome = nome
+        self.detalhes = detalhes
+
+    def __enter__(self):
+        self._token = _profundidade.set(_profundidade.get() + 1)
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo_erro, erro, rastro):
+        ms = (time.perf_counter() - self._inicio) * 1000
+        _profundidade.reset(self._token)
+        if tipo_erro is not None:
+            self.detalhes["erro"] = tipo_erro.__name__
+        registrar(self.nome, ms, _profundidade.get(), self._inicio, **self.detalhes)
+        return False
+
+def iniciar_execucao():
+    """Chamada no início de cada execução da página: a execução anterior vira a 'última' do painel."""
+    estado = _estado_sessao()
+    if estado is not None and estado["atual"]:
+        estado["ultima"], estado["atual"] = estado["atual"], []
+
+def ultima_execucao():
+    estado = _estado_sessao()
+    return sorted(estado["ultima"], key=lambda registro: registro["inicio"]) if estado else []
+
+def percentis():
+    """Retorna [{fase, n, p50_ms, p95_ms, max_ms}] das medições recentes do processo, das mais lentas (p95) para as mais rápidas."""
+    with _JANELAS["lock"]:
+        copias = {nome: sorted(tempos) for nome, tempos in _JANELAS["tempos"].items() if tempos}
+    linhas = [{"fase": nome, "n": len(t), "p50_ms": round(t[len(t) // 2], 1),
+               "p95_ms": round(t[max(0, -(-len(t) * 95 // 100) - 1)], 1), "max_ms": round(t[-1], 1)}
+              for nome, t in copias.items()]
+    return sorted(linhas, key=lambda linha: linha["p95_ms"], reverse=True)
+
+# --- CONSULTAS SQL ---
+# O cursor que cronometra os comandos (db.CursorCronometrado) fica junto do pool, que já importa o psycopg2.
+_TABELA = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE)\s+([a-z_]+)", re.IGNORECASE)
+
+def rotulo_sql(query):
+    """Rótulo curto e estável para agrupar consultas: comando + primeira tabela (ex.: 'sql SELECT solicitacoes')."""
+    texto = query.decode(errors="replace") if isinstance(query, bytes) else str(query)
+    texto = texto.strip()
+    comando = texto.split(None, 1)[0].upper() if texto else "?"
+    if comando == "WITH":
+        comando = "SELECT" if "SELECT" in texto.upper() else comando
+    tabela = _TABELA.search(texto)
+    return f"sql {comando} {tabela.group(1) if tabela else ''}".strip()
@@ -0,0 +1,69 @@
+# manutencao.py
+"""
+Rotinas de manutenção do banco, para rodar fora do Streamlit (cron, agendador de tarefas ou à mão).
+Usa as mesmas credenciais do aplicativo (.streamlit/secrets.toml, seção [database]).
+
+    python manutencao.py arquivar --dias 180             # move encerradas há mais de 180 dias para o arquivo
+    python manutencao.py arquivar --dias 180 --lote 200 --pausa 1
+    python manutencao.py recalcular-resumo               # reconstrói o resumo do painel
+"""
+
+import sys
+import time
+import logging
+import argparse
+
+import psycopg2.errors
+from db import aplicar_migracoes, arquivar_lote, recalcular_resumo
+
+logger = logging.getLogger("manutencao")
+
+TENTATIVAS_BLOQUEIO = 5  # lotes seguidos que podem esbarrar num bloqueio antes de desistir
+
+def arquivar(dias, tamanho_lote, pausa, max_lotes=None):
+    """
+    Arquiva em lotes até não sobrar nada (ou até 'max_lotes'). Cada lote é uma transação curta e, entre
+    um lote e outro, a pausa deixa o banco atender o aplicativo. Retorna o total de solicitações movidas.
+    """
+    total, lotes, bloqueios = 0, 0, 0
+    while max_lotes is None or lotes < max_lotes:
+        inicio = time.perf_counter()
+        try:
+            movidas = arquivar_lote(dias, tamanho_lote)
+        except psycopg2.errors.LockNotAvailable:
+            bloqueios += 1
+            if bloqueios >= TENTATIVAS_BLOQUEIO:
+                logger.warning("Tabela ocupada em %s tentativas seguidas; o arquivamento continua na próxima execução.", bloqueios)
+                break
+            time.sleep(pausa * 2 ** bloqueios); continue
+        bloqueios = 0; lotes += 1; total += movidas
+        logger.info("Lote %s: %s solicitação(ões) arquivada(s) em %.0f ms (total %s).",
+                    lotes, movidas, (time.perf_counter() - inicio) * 1000, total)
+        if movidas < tamanho_lote:
+            break
+        time.sleep(pausa)
+    return total
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Rotinas de manutenção do banco de solicitações.")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    arquivo = comandos.add_parser("arquivar", help="Move solicitações encerradas antigas para o arquivo.")
+    arquivo.add_argument("--dias", type=int, required=True, help="Encerradas (Concluído/Cancelado) sem alteração há mais de N dias.")
+    arquivo.add_argument("--lote", type=int, default=500, help="Solicitações por transação (padrão: 500).")
+    arquivo.add_argument("--pausa", type=float, default=0.5, help="Segundos entre um lote e outro (padrão: 0.5).")
+    arquivo.add_argument("--max-lotes", type=int, default=None, help="Para depois de N lotes (padrão: até terminar).")
+    comandos.add_parser("recalcular-resumo", help="Reconstrói o resumo do painel a partir das tabelas.")
+    args = parser.parse_args(argumentos)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    aplicar_migracoes()
+    if args.comando == "arquivar":
+        total = arquivar(args.dias, args.lote, args.pausa, args.max_lotes)
+        logger.info("Arquivamento concluído: %s solicitação(ões) movida(s).", total)
+    else:
+        recalcular_resumo()
+        logger.info("Resumo do painel reconstruído.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
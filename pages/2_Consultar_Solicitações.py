@@ -2,108 +2,259 @@
 
 import streamlit as st
 import pandas as pd
+import os
+import tempfile
 from datetime import datetime
-from io import BytesIO
-import psycopg2
-import warnings
-from PIL import Image
 from utils import configurar_pagina
+from instrumentacao import fase
+from sincronizacao import pagina_sincronizada, get_ouvinte
+from exportacao import exportar, limpar_temporarios, FORMATOS, LIMITE_LINHAS_XLSX, IDADE_MAXIMA_TEMPORARIOS
+from imagens import url_miniatura
+from formulario import (gerar_excel_formulario, gerar_zip_formularios, gerar_workbook_formularios,
+                        dados_formulario, nome_arquivo_formulario, MIME_XLSX)
+from db import (init_connection, buscar_solicitacoes, geracao_cache, contar_solicitacoes, atualizar_status_em_lote,
+                fetch_opcoes_filtro, iterar_solicitacoes, normalizar_busca, busca_so_por_prefixo, estatisticas_cache, LIMITE_BUSCA, CACHE_TTL, delete_solicitacao, update_status, FUSO_HORARIO,
+                STATUS_SOLICITACAO, fetch_solicitacao, memoria_df)
 
-warnings.filterwarnings("ignore", message="pandas only supports SQLAlchemy connectable.*", category=UserWarning)
-
-# --- FUNÇÕES DE BANCO DE DADOS E UTILITÁRIOS ---
-def init_connection():
-    try: return psycopg2.connect(**st.secrets["database"])
-    except Exception as e:
-        st.error(f"Erro ao conectar ao banco de dados: {e}"); return None
-
-def fetch_all_solicitacoes(conn):
-    if conn is None: return pd.DataFrame()
-    try:
-        query = "SELECT * FROM solicitacoes ORDER BY data_solicitacao DESC;"
-        df = pd.read_sql(query, conn)
-        return df
-    except Exception as e:
-        st.error(f"Erro ao buscar dados: {e}"); return pd.DataFrame()
-
-def delete_solicitacao(conn, id_para_excluir):
-    if conn is None: return False
-    try:
-        with conn.cursor() as cur:
-            cur.execute("DELETE FROM solicitacoes WHERE id = %s;", (id_para_excluir,))
-            conn.commit()
-        return True
-    except Exception as e:
-        st.error(f"Erro ao excluir a solicitação: {e}"); conn.rollback(); return False
-
-def update_status(conn, id_para_atualizar, novo_status):
-    if conn is None: return False
-    try:
-        with conn.cursor() as cur:
-            cur.execute("UPDATE solicitacoes SET status = %s WHERE id = %s;", (novo_status, id_para_atualizar))
-            conn.commit()
-        return True
-    except Exception as e:
-        st.error(f"Erro ao atualizar o status: {e}"); conn.rollback(); return False
-
-def to_excel(df):
-    output = BytesIO()
-    df_copy = df.copy()
-    if 'data_solicitacao' in df_copy.columns:
-        df_copy['data_solicitacao'] = df_copy['data_solicitacao'].dt.tz_localize(None)
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df_copy.to_excel(writer, index=False, sheet_name='RelatorioSolicitacoes')
-        worksheet = writer.sheets['RelatorioSolicitacoes']
-        for i, col in enumerate(df_copy.columns):
-            column_len = max(df_copy[col].astype(str).map(len).max(), len(col)) + 2
-            worksheet.set_column(i, i, column_len)
-    return output.getvalue()
-
-def gerar_excel_formulario(dados):
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        workbook  = writer.book
-        worksheet = workbook.add_worksheet('Solicitacao')
-        header_format = workbook.add_format({'bold': True, 'font_size': 16, 'align': 'center', 'valign': 'vcenter', 'border': 1})
-        code_format = workbook.add_format({'font_size': 10, 'align': 'center', 'valign': 'vcenter', 'border': 1})
-        title_format = workbook.add_format({'bold': True, 'font_size': 11, 'align': 'left', 'valign': 'vcenter'})
-        data_format = workbook.add_format({'font_size': 11, 'align': 'left', 'valign': 'vcenter', 'border': 1, 'text_wrap': True})
-        money_format = workbook.add_format({'num_format': 'R$ #,##0.00', 'font_size': 11, 'align': 'left', 'valign': 'vcenter', 'border': 1})
-
-        worksheet.merge_range('A1:A2', '', header_format)
-        try:
-            largura_desejada_px, altura_desejada_px = 159, 57
-            with Image.open("assets/logo.png") as img:
-                largura_original_px, altura_original_px = img.size
-            escala_x = largura_desejada_px / largura_original_px
-            escala_y = altura_desejada_px / altura_original_px
-            worksheet.insert_image('A1', 'assets/logo.png', {'x_scale': escala_x, 'y_scale': escala_y, 'object_position': 1})
-        except FileNotFoundError:
-            worksheet.write('A1', 'Logo')
-
-        worksheet.merge_range('B1:C2', 'FORMULÁRIO DE ENVIO PARA ASSISTÊNCIA TÉCNICA', header_format)
-        worksheet.write('D1', 'F00000', code_format)
-        worksheet.write('D2', 'Ver:00', code_format)
-        
-        worksheet.set_row(0, 35); worksheet.set_row(1, 35)
-        
-        row = 2
-        for campo, valor_dado in dados.items():
-            worksheet.write(row, 0, campo, title_format)
-            if campo == "Valor":
-                worksheet.merge_range(row, 1, row, 3, valor_dado, money_format)
-            else:
-                worksheet.merge_range(row, 1, row, 3, str(valor_dado), data_format)
-            worksheet.set_row(row, 30)
-            row += 1
-            
-        worksheet.set_column('A:A', 30); worksheet.set_column('B:C', 25); worksheet.set_column('D:D', 10)
-        
-        row += 2
-        worksheet.merge_range(row, 0, row, 3, '_________________________________________', workbook.add_format({'align': 'center'}))
-        row += 1
-        worksheet.merge_range(row, 0, row, 3, 'Assinatura do Solicitante', workbook.add_format({'align': 'center'}))
-    return output.getvalue()
+INTERVALO_AUTO_ATUALIZACAO = "15s"
+LIMITE_IMPRESSAO_LOTE = 2000
+
+status_list = list(STATUS_SOLICITACAO)
+status_colors = {"Aguardando Envio": "gray", "Em Manutenção": "orange", "Concluído": "green", "Cancelado": "red"}
+status_icons = {"Aguardando Envio": "📬", "Em Manutenção": "🛠️", "Concluído": "✅", "Cancelado": "❌"}
+
+# --- FUNÇÕES UTILITÁRIAS ---
+@st.fragment(run_every=INTERVALO_AUTO_ATUALIZACAO)
+def vigiar_alteracoes():
+    # Roda sozinho a cada intervalo sem tocar no banco: só compara a geração do cache exibida (lista ou
+    # busca) com a atual, que o ouvinte LISTEN/NOTIFY avança a cada escrita. Sem o ouvinte, recarrega para sincronizar.
+    geracao_exibida = st.session_state.get("geracao_exibida")
+    if geracao_exibida is None:
+        return
+    if not get_ouvinte().conectado or geracao_exibida != geracao_cache():
+        st.rerun()
+
+@st.cache_resource(max_entries=20, ttl=IDADE_MAXIMA_TEMPORARIOS, show_spinner=False)
+def _conteudo_arquivo(caminho):
+    # Lido do disco uma única vez, logo depois de gerado: nos reruns o st.download_button recebe os mesmos
+    # bytes, que já estão registrados, em vez de reler o arquivo inteiro a cada execução da página
+    with open(caminho, "rb") as arquivo:
+        return arquivo.read()
+
+def descartar_arquivo(chave):
+    """Tira da sessão o arquivo gerado guardado em 'chave' e o apaga do disco e do cache de downloads."""
+    gerado = st.session_state.pop(chave, None)
+    if gerado:
+        _conteudo_arquivo.clear(gerado["caminho"])
+        if os.path.exists(gerado["caminho"]):
+            os.remove(gerado["caminho"])
+
+def editar_em_grade(df):
+    """
+    Edição de status em lote: as mudanças feitas na grade ficam pendentes até o usuário aplicar,
+    e então vão todas para o banco num único UPDATE. Linhas alteradas por outra pessoa nesse
+    meio-tempo são recusadas e informadas.
+    """
+    if 'versao_grade' not in st.session_state:
+        st.session_state.versao_grade = 0
+    colunas_grade = ['id', 'data_solicitacao', 'solicitante', 'modelo_equipamento', 'status']
+    if df['arquivada'].any():
+        st.caption("Solicitações arquivadas não podem ser alteradas e ficam fora da grade.")
+        df = df[~df['arquivada']]
+    original = df[colunas_grade + ['updated_at']].set_index('id')
+    # Se as linhas da página mudarem (sincronização), a grade recomeça: edições pendentes são por posição
+    assinatura = int(pd.util.hash_pandas_object(original['updated_at']).sum())
+    editado = st.data_editor(
+        original[colunas_grade[1:]], key=f"grade_{st.session_state.versao_grade}_{assinatura}", use_container_width=True,
+        disabled=colunas_grade[1:-1],
+        column_config={
+            "data_solicitacao": st.column_config.DatetimeColumn("Data", format="DD/MM/YYYY HH:mm"),
+            "solicitante": "Solicitante", "modelo_equipamento": "Modelo",
+            "status": st.column_config.SelectboxColumn("Status", options=status_list, required=True),
+        },
+    )
+    mudou = editado['status'] != original['status']
+    pendentes = original.loc[mudou].assign(novo_status=editado.loc[mudou, 'status'])
+    if pendentes.empty:
+        st.caption("Nenhuma alteração pendente."); return
+
+    st.info(f"{len(pendentes)} alteração(ões) de status pendente(s).")
+    col1, col2, _ = st.columns([1, 1, 4])
+    with col1:
+        if st.button("✔️ Aplicar alterações", type="primary"):
+            alteracoes = [(int(id_), novo, pd.Timestamp(versao).to_pydatetime())
+                          for id_, novo, versao in zip(pendentes.index, pendentes['novo_status'], pendentes['updated_at'])]
+            resultado = atualizar_status_em_lote(alteracoes)
+            if resultado is not None:
+                atualizados, conflitos = resultado
+                st.session_state.resultado_grade = (len(atualizados), conflitos)
+                st.session_state.versao_grade += 1; st.rerun()
+    with col2:
+        if st.button("Descartar"):
+            st.session_state.versao_grade += 1; st.rerun()
+
+@st.fragment
+def linha_solicitacao(id_solicitacao):
+    """
+    Uma linha da lista como unidade independente: mudar o status, gerar o formulário ou excluir
+    redesenha só esta linha e atualiza em memória a lista guardada na sessão.
+    """
+    df = st.session_state.df_exibido
+    indices = df.index[df['id'] == id_solicitacao]
+    if len(indices) == 0:
+        return  # excluída nesta sessão
+    indice = indices[0]; row = df.loc[indice]
+
+    col1, col2, col3, col4, col5, col6 = st.columns((2, 2, 2, 2, 1, 2))
+    with col1: st.write(row['data_solicitacao'].strftime('%d/%m/%Y %H:%M'))
+    with col2: st.write(row['solicitante'])
+    with col3: st.write(row['modelo_equipamento'])
+    with col4:
+        if row['arquivada']:
+            # Arquivada: só leitura (o status e a exclusão valem apenas para a tabela principal)
+            st.markdown(f"<span style='color:{status_colors.get(row['status'], 'black')};'>{status_icons.get(row['status'], '')} {row['status']}</span> · 📦 Arquivada", unsafe_allow_html=True)
+        else:
+            current_status_index = status_list.index(row['status']) if row['status'] in status_list else 0
+            # A chave inclui o status atual: se outra pessoa alterar a linha, o seletor é recriado com o valor novo
+            novo_status = st.selectbox(
+                "Status", options=status_list, index=current_status_index, 
+                key=f"status_{row['id']}_{row['status']}", label_visibility="collapsed"
+            )
+            st.markdown(f"<span style='color:{status_colors.get(row['status'], 'black')};'>{status_icons.get(row['status'], '')} {row['status']}</span>", unsafe_allow_html=True)
+            if novo_status != row['status']:
+                if update_status(row['id'], novo_status):
+                    df.loc[indice, 'status'] = novo_status
+                    st.toast(f"Status do ID {row['id']} atualizado para '{novo_status}'!")
+                    st.rerun(scope="fragment")
+    with col5:
+        if pd.notna(row['url_imagem']):
+            # Miniatura carregada só quando a linha aparece na tela; a imagem inteira abre no clique
+            miniatura = row['url_miniatura'] if pd.notna(row['url_miniatura']) else url_miniatura(row['url_imagem'])
+            st.markdown(f'<a href="{row["url_imagem"]}" target="_blank"><img src="{miniatura}" width="70" loading="lazy" decoding="async"></a>', unsafe_allow_html=True)
+        else:
+            st.write("N/A")
+    with col6:
+        action_col1, action_col2 = st.columns(2)
+        with action_col1:
+            if st.button("🖨️", key=f"form_{row['id']}", help="Gerar formulário Excel"):
+                # A lista só guarda as colunas exibidas: os detalhes são lidos agora, só desta linha
+                with fase("formulario"):
+                    registro = fetch_solicitacao(row['id'])
+                    if registro is not None:
+                        # Só o último formulário fica na sessão: gerar outro descarta o anterior
+                        st.session_state.formulario_gerado = {
+                            "id": row['id'], "data": gerar_excel_formulario(dados_formulario(registro)),
+                            "file_name": nome_arquivo_formulario(registro)
+                        }
+        with action_col2:
+            if st.button("🗑️", key=f"delete_{row['id']}", help="Excluir solicitação", disabled=bool(row['arquivada'])):
+                st.session_state.exclusao_pendente = row['id']
+
+    formulario = st.session_state.formulario_gerado
+    if formulario and formulario["id"] == row['id']:
+        st.download_button(
+            label="📥 Baixar Formulário Gerado", data=formulario["data"], file_name=formulario["file_name"],
+            mime=MIME_XLSX, key=f"baixar_{row['id']}", on_click="ignore"
+        )
+
+    # --- CONFIRMAÇÃO DE EXCLUSÃO ---
+    if st.session_state.exclusao_pendente == row['id']:
+        with st.expander("🚨 **CONFIRMAR EXCLUSÃO** 🚨", expanded=True):
+            st.warning(f"Você tem certeza que deseja excluir permanentemente a solicitação para o equipamento **{row['modelo_equipamento']}** (ID: {row['id']})?")
+            st.write("**Esta ação não pode ser desfeita.**")
+            col1, col2, _ = st.columns([1, 1, 4])
+            with col1:
+                if st.button("Sim, excluir", type="primary", key=f"confirmar_exclusao_{row['id']}"):
+                    if delete_solicitacao(row['id']):
+                        df.drop(index=indice, inplace=True)
+                        st.session_state.exclusao_pendente = None
+                        st.toast("Solicitação excluída com sucesso!"); st.rerun(scope="fragment")
+            with col2:
+                if st.button("Cancelar", key=f"cancelar_exclusao_{row['id']}"):
+                    st.session_state.exclusao_pendente = None; st.rerun(scope="fragment")
+
+@st.fragment
+def painel_exportacao(filtros, total):
+    """
+    O relatório só é gerado quando pedido, lendo o banco em fluxo para um arquivo temporário.
+    """
+    st.subheader("Exportar Lista Filtrada")
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        formato = st.selectbox("Formato:", options=list(FORMATOS), label_visibility="collapsed",
+                               help="Para períodos grandes, CSV e Parquet são bem mais rápidos que Excel.")
+    excede_excel = FORMATOS[formato]["extensao"] == "xlsx" and total > LIMITE_LINHAS_XLSX
+    with col2:
+        gerar = st.button(f"📊 Gerar relatório ({total} linhas)", disabled=excede_excel)
+    if excede_excel:
+        st.warning(f"O Excel comporta até {LIMITE_LINHAS_XLSX} linhas: escolha CSV ou Parquet, ou refine os filtros.")
+    elif total > 100_000 and FORMATOS[formato]["extensao"] == "xlsx":
+        st.caption("Relatório grande: prefira CSV ou Parquet.")
+
+    if gerar:
+        descartar_arquivo("exportacao")
+        with st.spinner("Gerando relatório..."), fase("exportacao", formato=formato) as medicao:
+            try:
+                caminho, linhas = exportar(formato, **filtros)
+                medicao.detalhes["linhas"] = linhas
+            except Exception as e:
+                st.error(f"Erro ao gerar o relatório: {e}"); return
+        _conteudo_arquivo(caminho)
+        st.session_state.exportacao = {
+            "caminho": caminho, "linhas": linhas, "mime": FORMATOS[formato]["mime"],
+            "file_name": f"relatorio_solicitacoes_{datetime.now().strftime('%Y%m%d')}.{FORMATOS[formato]['extensao']}"
+        }
+    gerado = st.session_state.get("exportacao")
+    if gerado and os.path.exists(gerado["caminho"]):
+        st.download_button(label=f"📥 Baixar relatório ({gerado['linhas']} linhas)", data=_conteudo_arquivo(gerado["caminho"]),
+                           file_name=gerado["file_name"], mime=gerado["mime"], on_click="ignore")
+
+@st.fragment
+def painel_impressao_lote(filtros, total):
+    """
+    Gera de uma vez os formulários de todas as solicitações filtradas: um .zip com um arquivo por
+    solicitação (renderizado em paralelo) ou uma planilha com uma aba por solicitação.
+    """
+    st.subheader("Imprimir Formulários em Lote")
+    formato = st.radio("Formato:", ["ZIP (um arquivo por solicitação)", "Planilha única (uma aba por solicitação)"],
+                       horizontal=True, label_visibility="collapsed")
+    quantidade = min(total, LIMITE_IMPRESSAO_LOTE)
+    if total > LIMITE_IMPRESSAO_LOTE:
+        st.caption(f"Serão gerados os {LIMITE_IMPRESSAO_LOTE} formulários mais recentes; refine os filtros para os demais.")
+
+    if st.button(f"🖨️ Gerar {quantidade} formulário(s)", disabled=quantidade == 0):
+        descartar_arquivo("impressao_lote")
+        em_zip = formato.startswith("ZIP")
+        extensao = "zip" if em_zip else "xlsx"
+        limpar_temporarios()
+        descritor, caminho = tempfile.mkstemp(suffix=f".{extensao}", prefix="formularios_")
+        os.close(descritor)
+        barra = st.progress(0.0, text="Gerando formulários...")
+        def ao_progredir(prontos):
+            barra.progress(prontos / quantidade, text=f"{prontos} de {quantidade} formulários")
+        with fase("impressao_lote", formato=extensao) as medicao:
+            # As linhas vêm do banco em fluxo e cada formulário é descartado da memória assim que gravado
+            registros = iterar_solicitacoes(limite=quantidade, **filtros)
+            try:
+                if em_zip:
+                    itens = ((f"{r['id']}_{nome_arquivo_formulario(r)}", dados_formulario(r)) for r in registros)
+                    gerados = gerar_zip_formularios(itens, caminho, ao_progredir=ao_progredir)
+                else:
+                    itens = ((f"{r['id']} {r['modelo_equipamento']}", dados_formulario(r)) for r in registros)
+                    gerados = gerar_workbook_formularios(itens, caminho, ao_progredir=ao_progredir)
+                medicao.detalhes["linhas"] = gerados
+            except Exception as e:
+                os.remove(caminho); st.error(f"Erro ao gerar os formulários: {e}"); return
+        barra.empty()
+        _conteudo_arquivo(caminho)
+        st.session_state.impressao_lote = {
+            "caminho": caminho, "quantidade": gerados, "mime": "application/zip" if em_zip else MIME_XLSX,
+            "file_name": f"formularios_{datetime.now().strftime('%Y%m%d')}.{extensao}"
+        }
+    gerado = st.session_state.get("impressao_lote")
+    if gerado and os.path.exists(gerado["caminho"]):
+        st.download_button(label=f"📥 Baixar {gerado['quantidade']} formulário(s)", data=_conteudo_arquivo(gerado["caminho"]),
+                           file_name=gerado["file_name"], mime=gerado["mime"], on_click="ignore")
 
 # --- LÓGICA DA PÁGINA ---
 if not st.session_state.get("identificado", False):
@@ -112,122 +263,126 @@ if not st.session_state.get("identificado", False):
 configurar_pagina(titulo_pagina="📊 Consultar Histórico de Solicitações")
 st.markdown("---")
 
-conn = init_connection()
-if not conn:
+with fase("conexao"):
+    pool = init_connection()
+if pool is None:
     st.stop()
 
-# --- MODAL DE CONFIRMAÇÃO DE EXCLUSÃO ---
-if 'solicitacao_para_excluir' not in st.session_state:
-    st.session_state.solicitacao_para_excluir = None
-
-if st.session_state.solicitacao_para_excluir is not None:
-    solicitacao = st.session_state.solicitacao_para_excluir
-    with st.expander("🚨 **CONFIRMAR EXCLUSÃO** 🚨", expanded=True):
-        st.warning(f"Você tem certeza que deseja excluir permanentemente a solicitação para o equipamento **{solicitacao['modelo_equipamento']}** (ID: {solicitacao['id']})?")
-        st.write("**Esta ação não pode ser desfeita.**")
-        col1, col2, _ = st.columns([1, 1, 4])
-        with col1:
-            if st.button("Sim, excluir", type="primary"):
-                if delete_solicitacao(conn, solicitacao['id']):
-                    st.success("Solicitação excluída com sucesso!")
-                    st.session_state.solicitacao_para_excluir = None; st.rerun()
-        with col2:
-            if st.button("Cancelar"):
-                st.session_state.solicitacao_para_excluir = None; st.rerun()
+if 'exclusao_pendente' not in st.session_state:
+    st.session_state.exclusao_pendente = None
+if 'formulario_gerado' not in st.session_state:
+    st.session_state.formulario_gerado = None
 
 # --- LÓGICA PRINCIPAL DA PÁGINA ---
-if st.session_state.solicitacao_para_excluir is None:
-    df = fetch_all_solicitacoes(conn)
-    if df.empty:
-        st.warning("Nenhuma solicitação encontrada."); st.stop()
-
-    # --- FILTROS ---
-    st.sidebar.header("Filtros da Consulta")
-    search_term = st.sidebar.text_input("Buscar por Solicitante, Modelo ou Código:")
-    
-    status_options = ["Todos"] + list(df['status'].unique())
-    status_filter = st.sidebar.multiselect("Filtrar por Status:", options=status_options, default=["Todos"])
-    
-    min_date, max_date = df['data_solicitacao'].min().date(), df['data_solicitacao'].max().date()
-    date_range = st.sidebar.date_input("Filtrar por Data:", value=(min_date, max_date), min_value=min_date, max_value=max_date)
-    
-    df_filtrado = df.copy()
-    if search_term:
-        df_filtrado = df_filtrado[df_filtrado.apply(lambda row: search_term.lower() in str(row['solicitante']).lower() or \
-                                                              search_term.lower() in str(row['modelo_equipamento']).lower() or \
-                                                              search_term.lower() in str(row['codigo_equipamento']).lower(), axis=1)]
-    if "Todos" not in status_filter:
-        df_filtrado = df_filtrado[df_filtrado['status'].isin(status_filter)]
-    if len(date_range) == 2:
-        start_date, end_date = pd.to_datetime(date_range[0]).date(), pd.to_datetime(date_range[1]).date()
-        df_filtrado = df_filtrado[df_filtrado['data_solicitacao'].dt.date.between(start_date, end_date)]
-
-    # --- EXIBIÇÃO DA TABELA ---
-    st.write(f"**Exibindo {len(df_filtrado)} de {len(df)} solicitações.**")
-    
+st.sidebar.header("Filtros da Consulta")
+# Por padrão a consulta lê só a tabela principal; as encerradas antigas ficam no arquivo (manutencao.py)
+incluir_arquivo = st.sidebar.toggle("📦 Incluir arquivo", help="Inclui as solicitações encerradas há mais tempo, que ficam fora da consulta padrão.")
+with fase("opcoes_filtro"):
+    opcoes_status, data_min, data_max = fetch_opcoes_filtro(incluir_arquivo=incluir_arquivo)
+if data_min is None:
+    st.warning("Nenhuma solicitação encontrada." + ("" if incluir_arquivo else " Experimente incluir o arquivo.")); st.stop()
+
+# --- FILTROS ---
+search_term = st.sidebar.text_input("Buscar por Solicitante, Modelo ou Código:",
+                                    help="Ignora acentos e maiúsculas, aceita início de palavras e pequenos erros de digitação.")
+
+status_options = ["Todos"] + opcoes_status
+status_filter = st.sidebar.multiselect("Filtrar por Status:", options=status_options, default=["Todos"])
+
+min_date, max_date = data_min.astimezone(FUSO_HORARIO).date(), data_max.astimezone(FUSO_HORARIO).date()
+date_range = st.sidebar.date_input("Filtrar por Data:", value=(min_date, max_date), min_value=min_date, max_value=max_date)
+
+# Os filtros são aplicados no banco; a página só recebe as linhas que vai exibir.
+# O termo é normalizado antes de virar filtro: variações de caixa/pontuação do mesmo termo
+# não disparam nova consulta e termos curtos demais são ignorados até o usuário completar.
+termo_busca = normalizar_busca(search_term)
+if search_term.strip() and termo_busca is None:
+    st.sidebar.caption("Digite ao menos 2 caracteres para buscar.")
+elif termo_busca and busca_so_por_prefixo(termo_busca):
+    st.sidebar.caption("Com menos de 3 letras, a busca encontra só palavras que começam pelo termo.")
+filtros = {"busca": termo_busca}
+if "Todos" not in status_filter:
+    filtros["status"] = tuple(status_filter)
+if len(date_range) == 2:
+    filtros["data_inicio"], filtros["data_fim"] = date_range[0], date_range[1]
+if incluir_arquivo:
+    filtros["incluir_arquivo"] = True
+
+# --- PAGINAÇÃO (KEYSET) ---
+# A pilha guarda o cursor de início de cada página visitada; muda de filtro, volta à primeira página
+chave_filtros = repr(sorted(filtros.items()))
+if st.session_state.get("chave_filtros") != chave_filtros:
+    st.session_state.chave_filtros = chave_filtros
+    st.session_state.pilha_cursores = [None]
+    # Relatório e formulários gerados com os filtros anteriores não correspondem mais à lista
+    descartar_arquivo("exportacao"); descartar_arquivo("impressao_lote")
+
+geracao_exibida = geracao_cache()  # lida antes da consulta: uma escrita durante ela dispara nova atualização
+if termo_busca:
+    # Com busca, a lista vem ordenada por relevância e limitada às melhores ocorrências
+    filtros_sem_busca = {k: v for k, v in filtros.items() if k != "busca"}
+    with fase("busca") as medicao:
+        df_filtrado, proximo_cursor = buscar_solicitacoes(termo_busca, **filtros_sem_busca), None
+        medicao.detalhes["linhas"] = len(df_filtrado)
+else:
+    # Sem busca, a página fica na sessão e é atualizada só com o que mudou no banco
+    with fase("pagina") as medicao:
+        df_filtrado, proximo_cursor = pagina_sincronizada(cursor=st.session_state.pilha_cursores[-1], **filtros)
+        medicao.detalhes["linhas"] = len(df_filtrado)
+    # A página sincronizada só avança a geração quando consegue ler as alterações
+    geracao_exibida = st.session_state.lista_sincronizada["geracao"]
+st.session_state.geracao_exibida = geracao_exibida
+with fase("contagem"):
+    total_filtrado, total_geral = contar_solicitacoes(**filtros), contar_solicitacoes(incluir_arquivo=incluir_arquivo)
+
+# --- EXIBIÇÃO DA TABELA ---
+pagina_atual = len(st.session_state.pilha_cursores)
+st.write(f"**Exibindo {total_filtrado} de {total_geral} solicitações** (página {pagina_atual}, {len(df_filtrado)} nesta página).")
+if termo_busca and total_filtrado > LIMITE_BUSCA:
+    st.caption(f"Resultados ordenados por relevância; mostrando os {LIMITE_BUSCA} mais relevantes.")
+
+# As linhas (fragmentos) leem e atualizam a lista exibida direto na sessão
+st.session_state.df_exibido = df_filtrado
+
+if st.session_state.get('resultado_grade'):
+    atualizados, conflitos = st.session_state.resultado_grade
+    st.success(f"{atualizados} status atualizado(s).")
+    if conflitos:
+        st.warning(f"As solicitações {', '.join(map(str, conflitos))} foram alteradas ou excluídas por outra pessoa "
+                   "antes da aplicação e não foram modificadas. Confira os valores atuais e tente de novo.")
+    st.session_state.resultado_grade = None
+
+modo_grade = st.toggle("✏️ Editar status em grade", help="Altere vários status na tabela e aplique todos de uma vez.")
+if modo_grade:
+    with fase("grade", linhas=len(df_filtrado)):
+        editar_em_grade(df_filtrado)
+else:
     colunas = st.columns((2, 2, 2, 2, 1, 2)); campos = ["Data", "Solicitante", "Modelo", "Status", "Foto", "Ações"]
     for col, campo in zip(colunas, campos):
         col.markdown(f"**{campo}**")
 
-    if 'download_info' not in st.session_state:
-        st.session_state.download_info = None
+    with fase("linhas", linhas=len(df_filtrado)):
+        for id_solicitacao in df_filtrado['id'].tolist():
+            linha_solicitacao(id_solicitacao)
 
-    status_list = ["Aguardando Envio", "Em Manutenção", "Concluído", "Cancelado"]
-    status_colors = {"Aguardando Envio": "gray", "Em Manutenção": "orange", "Concluído": "green", "Cancelado": "red"}
-    status_icons = {"Aguardando Envio": "📬", "Em Manutenção": "🛠️", "Concluído": "✅", "Cancelado": "❌"}
+cache = estatisticas_cache()
+st.sidebar.caption(f"Cache de consultas: {cache['acertos']} acertos, {cache['faltas']} faltas "
+                   f"({cache['taxa_acerto']:.0%} de acerto, validade {CACHE_TTL}s).")
+st.sidebar.caption(f"Memória da lista nesta sessão: {memoria_df(df_filtrado) / 1024:.0f} KB.")
 
-    for index, row in df_filtrado.iterrows():
-        col1, col2, col3, col4, col5, col6 = st.columns((2, 2, 2, 2, 1, 2))
-        with col1: st.write(row['data_solicitacao'].strftime('%d/%m/%Y %H:%M'))
-        with col2: st.write(row['solicitante'])
-        with col3: st.write(row['modelo_equipamento'])
-        with col4:
-            current_status_index = status_list.index(row['status']) if row['status'] in status_list else 0
-            novo_status = st.selectbox(
-                "Status", options=status_list, index=current_status_index, 
-                key=f"status_{row['id']}", label_visibility="collapsed"
-            )
-            st.markdown(f"<span style='color:{status_colors.get(row['status'], 'black')};'>{status_icons.get(row['status'], '')} {row['status']}</span>", unsafe_allow_html=True)
-            if novo_status != row['status']:
-                if update_status(conn, row['id'], novo_status):
-                    st.success(f"Status do ID {row['id']} atualizado para '{novo_status}'!")
-                    st.rerun()
-        with col5:
-            if pd.notna(row['url_imagem']):
-                st.markdown(f'<a href="{row["url_imagem"]}" target="_blank"><img src="{row["url_imagem"]}" width="70"></a>', unsafe_allow_html=True)
-            else:
-                st.write("N/A")
-        with col6:
-            action_col1, action_col2 = st.columns(2)
-            with action_col1:
-                if st.button("🖨️", key=f"form_{row['id']}", help="Gerar formulário Excel"):
-                    dados_para_excel = {
-                        "Data da Solicitação": row['data_solicitacao'].strftime('%d/%m/%Y %H:%M:%S'), "Solicitante": row['solicitante'],
-                        "Setor/Cargo": row['setor_cargo'], "Modelo do Equipamento": row['modelo_equipamento'],
-                        "Descrição do Equipamento": row['descricao_equipamento'] or "Não informado", "Código do Equipamento": row['codigo_equipamento'],
-                        "Sistema Alocado": row['sistema_alocado'], "Quantidade": row['quantidade'], "Centro de Custo": row['centro_custo'] or "Não informado",
-                        "Valor": row['valor'] or 0.0, "Motivo do Envio": row['motivo_envio']
-                    }
-                    excel_bytes = gerar_excel_formulario(dados_para_excel)
-                    st.session_state.download_info = {"data": excel_bytes, "file_name": f"solicitacao_{row['solicitante'].split(' ')[0]}_{row['data_solicitacao'].strftime('%Y%m%d')}.xlsx"}
-                    st.rerun()
-            with action_col2:
-                if st.button("🗑️", key=f"delete_{row['id']}", help="Excluir solicitação"):
-                    st.session_state.solicitacao_para_excluir = row; st.rerun()
-
-    # --- LÓGICA DE DOWNLOAD E EXPORTAÇÃO ---
-    if st.session_state.download_info:
-        st.sidebar.markdown("---"); st.sidebar.subheader("Download Pronto")
-        st.sidebar.download_button(
-            label="📥 Baixar Formulário Gerado", data=st.session_state.download_info["data"],
-            file_name=st.session_state.download_info["file_name"],
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
-        st.session_state.download_info = None
-
-    st.markdown("---")
-    if not df_filtrado.empty:
-        excel_data = to_excel(df_filtrado)
-        st.download_button(label="📊 Exportar Lista Filtrada para Excel", data=excel_data,
-                           file_name=f"relatorio_solicitacoes_{datetime.now().strftime('%Y%m%d')}.xlsx",
-                           mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+if st.sidebar.toggle("🔄 Atualizar automaticamente", help="Recarrega a lista quando outra pessoa altera uma solicitação."):
+    vigiar_alteracoes()
+
+nav_col1, nav_col2, _ = st.columns([1, 1, 4])
+with nav_col1:
+    if st.button("⬅️ Página anterior", disabled=pagina_atual == 1):
+        st.session_state.pilha_cursores.pop(); st.rerun()
+with nav_col2:
+    if st.button("Próxima página ➡️", disabled=proximo_cursor is None):
+        st.session_state.pilha_cursores.append(proximo_cursor); st.rerun()
+
+# --- EXPORTAÇÃO ---
+st.markdown("---")
+if not df_filtrado.empty:
+    painel_exportacao(filtros, total_filtrado)
+    painel_impressao_lote(filtros, total_filtrado)
@@ -0,0 +1,73 @@
+# pages/3_Importar_Solicitações.py
+
+import time
+import streamlit as st
+from utils import configurar_pagina
+from db import init_connection, importar_solicitacoes
+from importacao import ler_planilha, validar, modelo_csv, relatorio_erros_csv, OBRIGATORIAS, OPCIONAIS
+
+LINHAS_PREVIA = 20
+
+# --- LEITURA E VALIDAÇÃO ---
+@st.cache_data(max_entries=4, show_spinner="Validando a planilha...")
+def validar_arquivo(conteudo, nome_arquivo):
+    # Em cache pelo conteúdo: os reruns da página (botões, filtros) não releem nem revalidam o arquivo
+    return validar(ler_planilha(conteudo, nome_arquivo))
+
+# --- LÓGICA DA PÁGINA ---
+if not st.session_state.get("identificado", False):
+    st.error("Por favor, faça a identificação na página principal para continuar."); st.stop()
+
+configurar_pagina(titulo_pagina="📥 Importar Solicitações em Lote")
+st.markdown("---")
+
+if init_connection() is None:
+    st.stop()
+
+st.write("Envie uma planilha **.csv** ou **.xlsx** com uma solicitação por linha. "
+         f"Colunas obrigatórias: `{'`, `'.join(OBRIGATORIAS)}`. Opcionais: `{'`, `'.join(OPCIONAIS)}`.")
+st.caption("Também são aceitos os rótulos do formulário (ex.: \"Modelo do Equipamento\"). Datas em DD/MM/AAAA ou AAAA-MM-DD; "
+           "sem data, vale o momento da importação. Sem status, a solicitação entra como \"Aguardando Envio\". "
+           "Importar o mesmo arquivo de novo não duplica as solicitações.")
+st.download_button("📄 Baixar modelo (.csv)", data=modelo_csv(), file_name="modelo_importacao_solicitacoes.csv",
+                   mime="text/csv", on_click="ignore")
+
+arquivo = st.file_uploader("Planilha de solicitações", type=["csv", "xlsx"])
+if arquivo is None:
+    st.stop()
+
+try:
+    validas, erros = validar_arquivo(arquivo.getvalue(), arquivo.name)
+except ValueError as e:
+    st.error(str(e)); st.stop()
+except Exception as e:
+    st.error(f"Não foi possível ler a planilha: {e}"); st.stop()
+
+linhas_com_erro = erros['linha'].nunique()
+col1, col2 = st.columns(2)
+col1.metric("Linhas válidas", len(validas))
+col2.metric("Linhas com erro", linhas_com_erro)
+
+if not erros.empty:
+    st.warning("As linhas com erro não serão importadas. Corrija-as na planilha e importe o arquivo de novo "
+               "(as linhas já importadas são ignoradas).")
+    st.dataframe(erros.head(1000), hide_index=True, use_container_width=True)
+    st.download_button("📥 Baixar relatório de erros (.csv)", data=relatorio_erros_csv(erros),
+                       file_name=f"erros_{arquivo.name.rsplit('.', 1)[0]}.csv", mime="text/csv", on_click="ignore")
+
+if validas.empty:
+    st.stop()
+
+with st.expander(f"Prévia das linhas válidas (primeiras {LINHAS_PREVIA})"):
+    st.dataframe(validas.drop(columns="id_envio").head(LINHAS_PREVIA), hide_index=True, use_container_width=True)
+
+if st.button(f"✔️ Importar {len(validas)} solicitação(ões)", type="primary"):
+    inicio = time.perf_counter()
+    try:
+        with st.spinner("Importando..."):
+            inseridas, ignoradas = importar_solicitacoes(validas)
+    except Exception as e:
+        st.error(f"Erro ao importar as solicitações (nenhuma linha foi gravada): {e}"); st.stop()
+    st.success(f"{inseridas} solicitação(ões) importada(s) em {time.perf_counter() - inicio:.1f}s.")
+    if ignoradas:
+        st.info(f"{ignoradas} linha(s) ignorada(s) por já terem sido importadas antes.")
@@ -0,0 +1,99 @@
+# pages/4_Painel.py
+
+import streamlit as st
+import pandas as pd
+from utils import configurar_pagina
+from db import init_connection, fetch_meses_painel, fetch_resumo, fetch_tempo_manutencao, DIMENSOES_PAINEL
+
+TOP_N = 10  # itens exibidos nos rankings por setor e modelo
+status_colors = {"Aguardando Envio": "#808080", "Em Manutenção": "#FFA500", "Concluído": "#2E8B57", "Cancelado": "#DC143C"}
+
+def moeda(valor):
+    return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+def ranking(dimensao, periodo):
+    df = fetch_resumo(dimensao, **periodo)
+    if df.empty:
+        st.caption("Sem dados no período."); return
+    df = df.assign(**{dimensao: df[dimensao].replace("", "Não informado")})
+    df = df.sort_values("solicitacoes", ascending=False).head(TOP_N)
+    st.bar_chart(df, x=dimensao, y="solicitacoes", horizontal=True, x_label="", y_label="Solicitações")
+
+# --- LÓGICA DA PÁGINA ---
+if not st.session_state.get("identificado", False):
+    st.error("Por favor, faça a identificação na página principal para continuar."); st.stop()
+
+configurar_pagina(titulo_pagina="📈 Painel de Manutenção")
+st.markdown("---")
+
+if init_connection() is None:
+    st.stop()
+
+primeiro_mes, ultimo_mes = fetch_meses_painel()
+if primeiro_mes is None:
+    st.warning("Nenhuma solicitação encontrada."); st.stop()
+
+# --- PERÍODO ---
+meses = [d.date() for d in pd.date_range(primeiro_mes, ultimo_mes, freq="MS")]
+mes_inicio, mes_fim = st.sidebar.select_slider("Período (mês da solicitação):", options=meses, value=(meses[0], meses[-1]),
+                                               format_func=lambda d: d.strftime("%m/%Y"))
+periodo = {"mes_inicio": mes_inicio, "mes_fim": mes_fim}
+
+# --- INDICADORES ---
+totais = fetch_resumo(**periodo)
+manutencao, em_andamento = fetch_tempo_manutencao(**periodo)
+if totais.empty or not totais['solicitacoes'].fillna(0).iloc[0]:
+    st.warning("Nenhuma solicitação no período selecionado."); st.stop()
+
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Solicitações", f"{int(totais['solicitacoes'].iloc[0]):,}".replace(",", "."))
+col2.metric("Valor total", moeda(totais['valor_total'].iloc[0]))
+col3.metric("Em manutenção agora", em_andamento["quantidade"] if em_andamento else "—",
+            help="Todas as solicitações com status \"Em Manutenção\" neste momento, independente do período.")
+if not manutencao.empty:
+    col4.metric("Tempo médio em manutenção", f"{manutencao['horas_total'].sum() / manutencao['intervalos'].sum() / 24:.1f} dias",
+                help="Média das manutenções concluídas no período.")
+
+# --- STATUS AO LONGO DO TEMPO ---
+st.subheader("Solicitações por mês e status")
+por_mes = fetch_resumo("status", por_mes=True, **periodo)
+if not por_mes.empty:
+    tabela = por_mes.pivot_table(index="mes", columns="status", values="solicitacoes", fill_value=0)
+    tabela.index = pd.to_datetime(tabela.index)
+    st.bar_chart(tabela, color=[status_colors.get(status, "#4682B4") for status in tabela.columns], x_label="Mês", y_label="Solicitações")
+    st.caption("Cada solicitação aparece no mês em que foi aberta, com o status atual.")
+
+# --- TEMPO EM MANUTENÇÃO ---
+st.subheader("Tempo em manutenção")
+col1, col2 = st.columns(2)
+with col1:
+    if manutencao.empty:
+        st.caption("Nenhuma manutenção concluída no período.")
+    else:
+        manutencao['mes'] = pd.to_datetime(manutencao['mes'])
+        manutencao['dias_media'] = manutencao['horas_media'] / 24
+        st.line_chart(manutencao, x="mes", y="dias_media", x_label="Mês de conclusão", y_label="Dias em manutenção (média)")
+with col2:
+    if em_andamento and em_andamento["quantidade"]:
+        st.metric("Manutenções em andamento", em_andamento["quantidade"])
+        st.metric("Há quanto tempo, em média", f"{em_andamento['horas_media'] / 24:.1f} dias")
+
+# --- CUSTO POR CENTRO DE CUSTO ---
+st.subheader("Custo por centro de custo")
+por_centro = fetch_resumo("centro_custo", **periodo)
+if not por_centro.empty:
+    por_centro['centro_custo'] = por_centro['centro_custo'].replace("", "Não informado")
+    por_centro = por_centro.sort_values("valor_total", ascending=False)
+    st.dataframe(por_centro.rename(columns={"centro_custo": DIMENSOES_PAINEL["centro_custo"], "solicitacoes": "Solicitações",
+                                            "itens": "Itens", "valor_total": "Valor total"}),
+                 hide_index=True, use_container_width=True,
+                 column_config={"Valor total": st.column_config.NumberColumn(format="R$ %.2f")})
+
+# --- RANKINGS ---
+col1, col2 = st.columns(2)
+with col1:
+    st.subheader(f"Top {TOP_N} setores")
+    ranking("setor_cargo", periodo)
+with col2:
+    st.subheader(f"Top {TOP_N} modelos")
+    ranking("modelo_equipamento", periodo)
@@ -0,0 +1,135 @@
+# sincronizacao.py
+
+import time
+import select
+import logging
+import threading
+from datetime import datetime, timedelta
+
+import streamlit as st
+import pandas as pd
+import psycopg2
+import psycopg2.extensions
+from db import fetch_pagina_solicitacoes, fetch_alteracoes, marca_sincronizacao, invalidar_cache, geracao_cache, CACHE_TTL, FUSO_HORARIO, TAMANHO_PAGINA
+
+logger = logging.getLogger(__name__)
+
+CANAL_ALTERACOES = "solicitacoes_alteradas"
+# Folga na marca d'água (que já vem do relógio do banco e recua até a transação de escrita aberta mais
+# antiga): cobre linhas gravadas no mesmo instante da marca. A mescla é idempotente.
+SOBREPOSICAO = timedelta(seconds=1)
+
+# --- OUVINTE DE NOTIFICAÇÕES (LISTEN/NOTIFY) ---
+class OuvinteAlteracoes:
+    """
+    Mantém uma conexão dedicada escutando o canal de alterações e invalida o cache de consultas
+    a cada aviso. Assim as sessões abertas sabem que algo mudou sem consultar a tabela.
+    """
+    def __init__(self, parametros, canal=CANAL_ALTERACOES):
+        self._parametros = dict(parametros)
+        self._canal = canal
+        self.conectado = False
+        self.avisos = 0
+        thread = threading.Thread(target=self._executar, name="ouvinte-alteracoes", daemon=True)
+        thread.start()
+
+    def _escutar(self):
+        conn = psycopg2.connect(**self._parametros)
+        try:
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {self._canal};")
+            self.conectado = True
+            # Avisos perdidos enquanto estava desconectado: força todo mundo a sincronizar
+            invalidar_cache()
+            while True:
+                if select.select([conn], [], [], 30) == ([], [], []):
+                    continue
+                conn.poll()
+                if conn.notifies:
+                    self.avisos += len(conn.notifies)
+                    conn.notifies.clear()
+                    invalidar_cache()
+        finally:
+            self.conectado = False
+            conn.close()
+
+    def _executar(self):
+        espera = 1
+        while True:
+            try:
+                self._escutar()
+            except Exception as e:
+                logger.warning("Ouvinte de alterações desconectado (%s); nova tentativa em %ss.", e, espera)
+            time.sleep(espera)
+            espera = min(espera * 2, 60)
+
+@st.cache_resource
+def get_ouvinte():
+    return OuvinteAlteracoes(st.secrets["database"])
+
+# --- MESCLA INCREMENTAL ---
+def _depois_de(df, chave):
+    """Linhas que vêm depois de 'chave' = (data_solicitacao, id) na ordem decrescente da lista."""
+    data, id_ = chave
+    return (df['data_solicitacao'] < data) | ((df['data_solicitacao'] == data) & (df['id'] < id_))
+
+def mesclar_alteracoes(df, alteradas, excluidos, cursor=None, limite=None):
+    """
+    Aplica a uma página já carregada as linhas alteradas e os ids excluídos desde a última sincronização.
+    Linhas que deixaram de atender aos filtros saem; novas linhas só entram se caem dentro da janela
+    da página (depois do cursor de início e, se a página estava cheia, antes da última linha exibida).
+    Retorna (df mesclado, houve_mudanca).
+    """
+    if alteradas.empty and not excluidos:
+        return df, False
+    validas = alteradas[alteradas['corresponde'].astype(bool)].drop(columns='corresponde')
+    if cursor is not None:
+        validas = validas[_depois_de(validas, cursor)]
+    if limite is not None and len(df) >= limite:
+        ultima = df.iloc[-1]
+        validas = validas[~_depois_de(validas, (ultima['data_solicitacao'], ultima['id']))]
+    remover = set(excluidos) | set(alteradas['id'])
+    partes = [parte for parte in (df[~df['id'].isin(remover)], validas) if not parte.empty]
+    if not partes:
+        return df.iloc[0:0], True
+    mesclado = pd.concat(partes, ignore_index=True)
+    return mesclado.sort_values(['data_solicitacao', 'id'], ascending=False, ignore_index=True), True
+
+def pagina_sincronizada(cursor=None, limite=TAMANHO_PAGINA, **filtros):
+    """
+    Versão incremental de fetch_pagina_solicitacoes para a sessão atual. A primeira carga de uma
+    página é completa; nas execuções seguintes só as alterações desde a marca d'água são lidas e
+    mescladas ao DataFrame guardado na sessão. Se o ouvinte está conectado e nenhuma escrita foi
+    avisada desde a última sincronização, o banco nem é consultado.
+    Retorna (df, proximo_cursor).
+    """
+    ouvinte = get_ouvinte()
+    chave = (repr(sorted(filtros.items())), cursor, limite)
+    geracao = geracao_cache()
+    estado = st.session_state.get("lista_sincronizada")
+
+    if estado is None or estado["chave"] != chave:
+        # Marca lida antes da página. O resultado pode ter saído do cache com até CACHE_TTL segundos:
+        # a marca recua o mesmo tanto (sem o banco, recua a partir do relógio local)
+        marca = marca_sincronizacao() or datetime.now(FUSO_HORARIO)
+        marca = marca - timedelta(seconds=CACHE_TTL) - SOBREPOSICAO
+        df, proximo_cursor = fetch_pagina_solicitacoes(cursor=cursor, limite=limite, **filtros)
+        st.session_state.lista_sincronizada = {"chave": chave, "df": df, "proximo_cursor": proximo_cursor,
+                                               "marca": marca, "geracao": geracao}
+        return df, proximo_cursor
+
+    if ouvinte.conectado and estado["geracao"] == geracao:
+        return estado["df"], estado["proximo_cursor"]
+
+    alteradas, excluidos, marca = fetch_alteracoes(estado["marca"], **filtros)
+    if alteradas is None:
+        return estado["df"], estado["proximo_cursor"]
+    df, mudou = mesclar_alteracoes(estado["df"], alteradas, excluidos, cursor=cursor, limite=limite)
+    proximo_cursor = estado["proximo_cursor"]
+    if mudou and len(df) > limite:
+        df = df.iloc[:limite]
+        ultima = df.iloc[-1]
+        proximo_cursor = (pd.Timestamp(ultima['data_solicitacao']).to_pydatetime(), int(ultima['id']))
+    estado.update(df=df, proximo_cursor=proximo_cursor, marca=marca - SOBREPOSICAO, geracao=geracao)
+    return df, proximo_cursor
@@ -0,0 +1,21 @@
+-- sql/000_solicitacoes.sql
+-- Tabela principal, como o formulário original a criou em produção. Num banco novo (testes, benchmarks)
+-- ela nasce aqui; nos existentes, nada muda. As colunas seguintes (busca, updated_at, url_miniatura,
+-- id_envio) vêm das migrações numeradas.
+
+CREATE TABLE IF NOT EXISTS solicitacoes (
+    id                    serial      PRIMARY KEY,
+    data_solicitacao      timestamptz NOT NULL DEFAULT now(),
+    solicitante           text,
+    setor_cargo           text,
+    modelo_equipamento    text,
+    descricao_equipamento text,
+    codigo_equipamento    text,
+    sistema_alocado       text,
+    quantidade            integer,
+    centro_custo          text,
+    valor                 numeric,
+    motivo_envio          text,
+    url_imagem            text,
+    status                text
+);
@@ -0,0 +1,10 @@
+-- sql/001_indices_consulta.sql
+-- Índices da consulta paginada: a página lista por (data_solicitacao, id) decrescente,
+-- com ou sem filtro de status. O índice com status na frente também atende à
+-- varredura de status distintos usada nas opções do filtro.
+
+CREATE INDEX IF NOT EXISTS idx_solicitacoes_data_id
+    ON solicitacoes (data_solicitacao DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_solicitacoes_status_data_id
+    ON solicitacoes (status, data_solicitacao DESC, id DESC);
@@ -0,0 +1,29 @@
+-- sql/002_busca.sql
+-- Busca por solicitante, modelo e código: texto normalizado (minúsculo e sem acento)
+-- mantido pelo próprio banco em colunas geradas, com índice de texto completo
+-- (buscas por prefixo) e índice de trigramas (erros de digitação e trechos do código).
+
+CREATE EXTENSION IF NOT EXISTS unaccent;
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- unaccent() não é IMMUTABLE e por isso não pode ser usada em índices nem em colunas geradas
+CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$;
+
+ALTER TABLE solicitacoes ADD COLUMN IF NOT EXISTS busca_texto text
+    GENERATED ALWAYS AS (
+        lower(f_unaccent(coalesce(solicitante, '') || ' ' || coalesce(modelo_equipamento, '') || ' ' || coalesce(codigo_equipamento, '')))
+    ) STORED;
+
+ALTER TABLE solicitacoes ADD COLUMN IF NOT EXISTS busca_tsv tsvector
+    GENERATED ALWAYS AS (
+        to_tsvector('simple'::regconfig,
+            lower(f_unaccent(coalesce(solicitante, '') || ' ' || coalesce(modelo_equipamento, '') || ' ' || coalesce(codigo_equipamento, ''))))
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_solicitacoes_busca_tsv
+    ON solicitacoes USING gin (busca_tsv);
+
+CREATE INDEX IF NOT EXISTS idx_solicitacoes_busca_trgm
+    ON solicitacoes USING gin (busca_texto gin_trgm_ops);
@@ -0,0 +1,62 @@
+-- sql/003_sincronizacao.sql
+-- Sincronização incremental da lista: cada linha guarda quando foi alterada pela última vez,
+-- exclusões deixam uma lápide com o id excluído e toda escrita avisa as instâncias da aplicação
+-- pelo canal 'solicitacoes_alteradas' (LISTEN/NOTIFY, entregue no COMMIT).
+
+-- A coluna entra sem valor padrão (não reescreve a tabela) e as linhas existentes recebem a data da
+-- solicitação: com o padrão já no ADD COLUMN, todas ficariam com o instante do deploy, e o arquivamento
+-- (sql/007) e o histórico do painel (sql/006) as tratariam como alteradas agora.
+ALTER TABLE solicitacoes ADD COLUMN IF NOT EXISTS updated_at timestamptz;
+UPDATE solicitacoes SET updated_at = coalesce(data_solicitacao, clock_timestamp()) WHERE updated_at IS NULL;
+ALTER TABLE solicitacoes ALTER COLUMN updated_at SET DEFAULT clock_timestamp();
+ALTER TABLE solicitacoes ALTER COLUMN updated_at SET NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_solicitacoes_updated_at
+    ON solicitacoes (updated_at);
+
+CREATE TABLE IF NOT EXISTS solicitacoes_excluidas (
+    id          bigint      NOT NULL,
+    excluido_em timestamptz NOT NULL DEFAULT clock_timestamp()
+);
+
+CREATE INDEX IF NOT EXISTS idx_solicitacoes_excluidas_excluido_em
+    ON solicitacoes_excluidas (excluido_em);
+
+CREATE OR REPLACE FUNCTION tg_solicitacoes_marcar_alteracao() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.updated_at := clock_timestamp();
+    RETURN NEW;
+END $$;
+
+CREATE OR REPLACE FUNCTION tg_solicitacoes_registrar_exclusao() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO solicitacoes_excluidas (id) SELECT id FROM linhas_excluidas;
+    -- Lápides só precisam viver o bastante para as sessões abertas sincronizarem
+    DELETE FROM solicitacoes_excluidas WHERE excluido_em < clock_timestamp() - interval '7 days';
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION tg_solicitacoes_notificar() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_notify('solicitacoes_alteradas', TG_OP);
+    RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS solicitacoes_marcar_alteracao ON solicitacoes;
+CREATE TRIGGER solicitacoes_marcar_alteracao
+    BEFORE UPDATE ON solicitacoes
+    FOR EACH ROW EXECUTE FUNCTION tg_solicitacoes_marcar_alteracao();
+
+DROP TRIGGER IF EXISTS solicitacoes_registrar_exclusao ON solicitacoes;
+CREATE TRIGGER solicitacoes_registrar_exclusao
+    AFTER DELETE ON solicitacoes
+    REFERENCING OLD TABLE AS linhas_excluidas
+    FOR EACH STATEMENT EXECUTE FUNCTION tg_solicitacoes_registrar_exclusao();
+
+DROP TRIGGER IF EXISTS solicitacoes_notificar ON solicitacoes;
+CREATE TRIGGER solicitacoes_notificar
+    AFTER INSERT OR UPDATE OR DELETE ON solicitacoes
+    FOR EACH STATEMENT EXECUTE FUNCTION tg_solicitacoes_notificar();
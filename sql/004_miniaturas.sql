@@ -0,0 +1,5 @@
+-- sql/004_miniaturas.sql
+-- URL da miniatura da foto (transformação do Cloudinary), usada na listagem no lugar da imagem original.
+-- Linhas antigas ficam com NULL: a aplicação deriva a miniatura da url_imagem quando precisa.
+
+ALTER TABLE solicitacoes ADD COLUMN IF NOT EXISTS url_miniatura text;
@@ -0,0 +1,8 @@
+-- sql/005_id_envio.sql
+-- Identificador gerado pela aplicação para cada envio do formulário. Torna a gravação idempotente:
+-- a fila de envio pode repetir um INSERT depois de uma falha sem duplicar a solicitação.
+
+ALTER TABLE solicitacoes ADD COLUMN IF NOT EXISTS id_envio uuid;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_solicitacoes_id_envio
+    ON solicitacoes (id_envio);
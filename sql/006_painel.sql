@@ -0,0 +1,175 @@
+-- sql/006_painel.sql
+-- Painel gerencial: os números saem de tabelas de resumo mantidas por gatilhos a cada escrita,
+-- não da tabela de solicitações. O tamanho delas depende da quantidade de combinações
+-- (mês x status x setor x modelo x centro de custo), não da quantidade de solicitações.
+
+-- Contagens e valores por mês da solicitação e dimensão. Dimensões vazias viram '' (a chave primária não aceita NULL).
+CREATE TABLE IF NOT EXISTS resumo_solicitacoes (
+    mes                date    NOT NULL,
+    status             text    NOT NULL,
+    setor_cargo        text    NOT NULL,
+    modelo_equipamento text    NOT NULL,
+    centro_custo       text    NOT NULL,
+    solicitacoes       bigint  NOT NULL DEFAULT 0,
+    itens              bigint  NOT NULL DEFAULT 0,
+    valor_total        numeric NOT NULL DEFAULT 0,
+    PRIMARY KEY (mes, status, setor_cargo, modelo_equipamento, centro_custo)
+);
+
+-- Um intervalo por status assumido por uma solicitação; fim NULL = status atual
+CREATE TABLE IF NOT EXISTS historico_status (
+    id             bigserial   PRIMARY KEY,
+    solicitacao_id bigint      NOT NULL,
+    status         text        NOT NULL,
+    inicio         timestamptz NOT NULL,
+    fim            timestamptz
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_historico_status_aberto
+    ON historico_status (solicitacao_id) WHERE fim IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_historico_status_atual
+    ON historico_status (status, inicio) WHERE fim IS NULL;
+
+-- Tempo já encerrado em "Em Manutenção", pelo mês em que a manutenção terminou
+CREATE TABLE IF NOT EXISTS resumo_manutencao (
+    mes        date    PRIMARY KEY,
+    intervalos bigint  NOT NULL DEFAULT 0,
+    segundos   numeric NOT NULL DEFAULT 0
+);
+
+CREATE OR REPLACE FUNCTION tg_solicitacoes_resumo() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+DECLARE
+    delta text := CASE TG_OP
+        WHEN 'INSERT' THEN 'SELECT 1 AS sinal, * FROM linhas_novas'
+        WHEN 'DELETE' THEN 'SELECT -1 AS sinal, * FROM linhas_antigas'
+        ELSE 'SELECT -1 AS sinal, * FROM linhas_antigas UNION ALL SELECT 1, * FROM linhas_novas'
+    END;
+BEGIN
+    -- A rotina de arquivamento (sql/007_arquivo.sql) só muda a solicitação de tabela: o resumo não muda
+    IF current_setting('app.arquivando', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    -- Soma numa única passada o que saiu (-1) e o que entrou (+1); alterações que não mudam
+    -- nenhuma dimensão (foto, descrição...) se anulam no HAVING e não tocam no resumo.
+    -- A ordem fixa das chaves evita impasse entre transações concorrentes.
+    EXECUTE format($q$
+        INSERT INTO resumo_solicitacoes AS r
+            (mes, status, setor_cargo, modelo_equipamento, centro_custo, solicitacoes, itens, valor_total)
+        SELECT date_trunc('month', data_solicitacao AT TIME ZONE 'America/Sao_Paulo')::date,
+               coalesce(status, ''), coalesce(setor_cargo, ''), coalesce(modelo_equipamento, ''), coalesce(centro_custo, ''),
+               sum(sinal), sum(sinal * coalesce(quantidade, 0)), sum(sinal * coalesce(valor, 0))
+        FROM (%s) AS delta
+        GROUP BY 1, 2, 3, 4, 5
+        HAVING sum(sinal) <> 0 OR sum(sinal * coalesce(quantidade, 0)) <> 0 OR sum(sinal * coalesce(valor, 0)) <> 0
+        ORDER BY 1, 2, 3, 4, 5
+        ON CONFLICT (mes, status, setor_cargo, modelo_equipamento, centro_custo) DO UPDATE
+        SET solicitacoes = r.solicitacoes + EXCLUDED.solicitacoes,
+            itens = r.itens + EXCLUDED.itens,
+            valor_total = r.valor_total + EXCLUDED.valor_total;
+    $q$, delta);
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION _fechar_historico_status(ids bigint[]) RETURNS void
+    LANGUAGE sql AS $$
+    WITH fechados AS (
+        UPDATE historico_status SET fim = clock_timestamp()
+        WHERE solicitacao_id = ANY (ids) AND fim IS NULL
+        RETURNING status, inicio, fim
+    )
+    INSERT INTO resumo_manutencao AS r (mes, intervalos, segundos)
+    SELECT date_trunc('month', fim AT TIME ZONE 'America/Sao_Paulo')::date, count(*), sum(extract(epoch FROM fim - inicio))
+    FROM fechados WHERE status = 'Em Manutenção'
+    GROUP BY 1
+    ON CONFLICT (mes) DO UPDATE
+    SET intervalos = r.intervalos + EXCLUDED.intervalos, segundos = r.segundos + EXCLUDED.segundos;
+$$;
+
+CREATE OR REPLACE FUNCTION tg_solicitacoes_historico_status() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+BEGIN
+    IF current_setting('app.arquivando', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO historico_status (solicitacao_id, status, inicio)
+        SELECT id, status, data_solicitacao FROM linhas_novas WHERE status IS NOT NULL;
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM _fechar_historico_status(array_agg(n.id))
+        FROM linhas_novas n JOIN linhas_antigas a ON a.id = n.id
+        WHERE n.status IS DISTINCT FROM a.status;
+        INSERT INTO historico_status (solicitacao_id, status, inicio)
+        SELECT n.id, n.status, clock_timestamp()
+        FROM linhas_novas n JOIN linhas_antigas a ON a.id = n.id
+        WHERE n.status IS DISTINCT FROM a.status AND n.status IS NOT NULL;
+    ELSE
+        PERFORM _fechar_historico_status(array_agg(id)) FROM linhas_antigas;
+    END IF;
+    RETURN NULL;
+END $$;
+
+-- Reconstrói o resumo a partir da tabela (carga inicial ou conferência manual: SELECT recalcular_resumo_solicitacoes();)
+CREATE OR REPLACE FUNCTION recalcular_resumo_solicitacoes() RETURNS void
+    LANGUAGE sql AS $$
+    LOCK TABLE solicitacoes IN SHARE MODE;
+    TRUNCATE resumo_solicitacoes;
+    INSERT INTO resumo_solicitacoes (mes, status, setor_cargo, modelo_equipamento, centro_custo, solicitacoes, itens, valor_total)
+    SELECT date_trunc('month', data_solicitacao AT TIME ZONE 'America/Sao_Paulo')::date,
+           coalesce(status, ''), coalesce(setor_cargo, ''), coalesce(modelo_equipamento, ''), coalesce(centro_custo, ''),
+           count(*), coalesce(sum(quantidade), 0), coalesce(sum(valor), 0)
+    FROM solicitacoes
+    GROUP BY 1, 2, 3, 4, 5;
+$$;
+
+DROP TRIGGER IF EXISTS solicitacoes_resumo_insert ON solicitacoes;
+CREATE TRIGGER solicitacoes_resumo_insert
+    AFTER INSERT ON solicitacoes
+    REFERENCING NEW TABLE AS linhas_novas
+    FOR EACH STATEMENT EXECUTE FUNCTION tg_solicitacoes_resumo();
+
+DROP TRIGGER IF EXISTS solicitacoes_resumo_update ON solicitacoes;
+CREATE TRIGGER solicitacoes_resumo_update
+    AFTER UPDATE ON solicitacoes
+    REFERENCING OLD TABLE AS linhas_antigas NEW TABLE AS linhas_novas
+    FOR EACH STATEMENT EXECUTE FUNCTION tg_solicitacoes_resumo();
+
+DROP TRIGGER IF EXISTS solicitacoes_resumo_delete ON solicitacoes;
+CREATE TRIGGER solicitacoes_resumo_delete
+    AFTER DELETE ON solicitacoes
+    REFERENCING OLD TABLE AS linhas_antigas
+    FOR EACH STATEMENT EXECUTE FUNCTION tg_solicitacoes_resumo();
+
+DROP TRIGGER IF EXISTS solicitacoes_historico_insert ON solicitacoes;
+CREATE TRIGGER solicitacoes_historico_insert
+    AFTER INSERT ON solicitacoes
+    REFERENCING NEW TABLE AS linhas_novas
+    FOR EACH STATEMENT EXECUTE FUNCTION tg_solicitacoes_historico_status();
+
+DROP TRIGGER IF EXISTS solicitacoes_historico_update ON solicitacoes;
+CREATE TRIGGER solicitacoes_historico_update
+    AFTER UPDATE ON solicitacoes
+    REFERENCING OLD TABLE AS linhas_antigas NEW TABLE AS linhas_novas
+    FOR EACH STATEMENT EXECUTE FUNCTION tg_solicitacoes_historico_status();
+
+DROP TRIGGER IF EXISTS solicitacoes_historico_delete ON solicitacoes;
+CREATE TRIGGER solicitacoes_historico_delete
+    AFTER DELETE ON solicitacoes
+    REFERENCING OLD TABLE AS linhas_antigas
+    FOR EACH STATEMENT EXECUTE FUNCTION tg_solicitacoes_historico_status();
+
+-- Carga inicial (só na primeira vez: depois os gatilhos mantêm as tabelas). Os gatilhos acima já
+-- bloqueiam escritas concorrentes até o fim desta transação, então a carga não perde nenhuma linha.
+-- O histórico anterior não existe: cada solicitação começa com o status atual, desde a última alteração.
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM resumo_solicitacoes) THEN
+        PERFORM recalcular_resumo_solicitacoes();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM historico_status) THEN
+        INSERT INTO historico_status (solicitacao_id, status, inicio)
+        SELECT id, status, CASE WHEN status = 'Aguardando Envio' THEN data_solicitacao ELSE updated_at END
+        FROM solicitacoes WHERE status IS NOT NULL;
+    END IF;
+END $$;
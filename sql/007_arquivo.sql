@@ -0,0 +1,114 @@
+-- sql/007_arquivo.sql
+-- Arquivo de solicitações encerradas: "Concluído" e "Cancelado" sem alteração há mais de N dias saem da
+-- tabela principal para solicitacoes_arquivo (rotina arquivar_solicitacoes, chamada em lotes pelo
+-- manutencao.py). A lista consulta só a tabela principal; a visão solicitacoes_com_arquivo junta as duas
+-- para quando o usuário pede o arquivo. O resumo do painel continua contando as arquivadas.
+
+CREATE TABLE IF NOT EXISTS solicitacoes_arquivo (
+    arquivado_em timestamptz NOT NULL DEFAULT clock_timestamp()
+);
+
+-- O arquivo acompanha as colunas da tabela principal (inclusive as geradas da busca) e a visão
+-- solicitacoes_com_arquivo é recriada com elas. db.aplicar_migracoes chama esta rotina depois de aplicar
+-- qualquer script novo: colunas criadas por migrações futuras são copiadas sem repetir o ALTER aqui.
+CREATE OR REPLACE FUNCTION sincronizar_arquivo_solicitacoes() RETURNS void
+    LANGUAGE plpgsql AS $$
+DECLARE
+    coluna record;
+    colunas text;
+BEGIN
+    FOR coluna IN
+        SELECT a.attname, format_type(a.atttypid, a.atttypmod) AS tipo, a.attgenerated, pg_get_expr(d.adbin, d.adrelid) AS expressao
+        FROM pg_attribute a
+        LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+        WHERE a.attrelid = 'solicitacoes'::regclass AND a.attnum > 0 AND NOT a.attisdropped
+          AND NOT EXISTS (SELECT 1 FROM pg_attribute b
+                          WHERE b.attrelid = 'solicitacoes_arquivo'::regclass AND b.attname = a.attname AND NOT b.attisdropped)
+        ORDER BY a.attnum
+    LOOP
+        EXECUTE format('ALTER TABLE solicitacoes_arquivo ADD COLUMN %I %s %s', coluna.attname, coluna.tipo,
+                       CASE WHEN coluna.attgenerated = 's' THEN format('GENERATED ALWAYS AS (%s) STORED', coluna.expressao) ELSE '' END);
+    END LOOP;
+
+    -- Visão com as duas tabelas
+    SELECT string_agg(quote_ident(attname), ', ' ORDER BY attnum) INTO colunas
+    FROM pg_attribute WHERE attrelid = 'solicitacoes'::regclass AND attnum > 0 AND NOT attisdropped;
+    DROP VIEW IF EXISTS solicitacoes_com_arquivo;
+    EXECUTE format('CREATE VIEW solicitacoes_com_arquivo AS '
+                   'SELECT %1$s, false AS arquivada FROM solicitacoes '
+                   'UNION ALL SELECT %1$s, true AS arquivada FROM solicitacoes_arquivo', colunas);
+END $$;
+
+SELECT sincronizar_arquivo_solicitacoes();
+
+-- Os mesmos índices da tabela principal: a consulta com arquivo faz a mesma paginação e busca nas duas
+CREATE UNIQUE INDEX IF NOT EXISTS idx_solicitacoes_arquivo_id
+    ON solicitacoes_arquivo (id);
+
+CREATE INDEX IF NOT EXISTS idx_solicitacoes_arquivo_data_id
+    ON solicitacoes_arquivo (data_solicitacao DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_solicitacoes_arquivo_status_data_id
+    ON solicitacoes_arquivo (status, data_solicitacao DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_solicitacoes_arquivo_busca_tsv
+    ON solicitacoes_arquivo USING gin (busca_tsv);
+
+CREATE INDEX IF NOT EXISTS idx_solicitacoes_arquivo_busca_trgm
+    ON solicitacoes_arquivo USING gin (busca_texto gin_trgm_ops);
+
+-- Sincronização da lista com o arquivo incluído (fetch_alteracoes filtra por updated_at)
+CREATE INDEX IF NOT EXISTS idx_solicitacoes_arquivo_updated_at
+    ON solicitacoes_arquivo (updated_at);
+
+-- Localiza os candidatos ao arquivamento sem varrer as solicitações em aberto
+CREATE INDEX IF NOT EXISTS idx_solicitacoes_encerradas
+    ON solicitacoes (updated_at) WHERE status IN ('Concluído', 'Cancelado');
+
+-- Move um lote de solicitações encerradas há mais de 'dias' dias. Retorna quantas foram movidas (0 = nada a fazer).
+-- Cada chamada é uma transação curta: as linhas são travadas com SKIP LOCKED (quem está editando uma delas
+-- não é esperado nem bloqueado) e lock_timeout evita ficar na fila de um bloqueio de tabela.
+CREATE OR REPLACE FUNCTION arquivar_solicitacoes(dias integer, tamanho_lote integer DEFAULT 500) RETURNS integer
+    LANGUAGE plpgsql AS $$
+DECLARE
+    colunas text;
+    movidas integer;
+BEGIN
+    SELECT string_agg(quote_ident(attname), ', ' ORDER BY attnum) INTO colunas
+    FROM pg_attribute WHERE attrelid = 'solicitacoes'::regclass AND attnum > 0 AND NOT attisdropped AND attgenerated = '';
+    PERFORM set_config('lock_timeout', '2s', true);
+    -- Os gatilhos do painel ignoram esta exclusão (a solicitação continua existindo, só muda de tabela)
+    PERFORM set_config('app.arquivando', 'on', true);
+    EXECUTE format($q$
+        WITH lote AS (
+            SELECT id FROM solicitacoes
+            WHERE status IN ('Concluído', 'Cancelado') AND updated_at < now() - make_interval(days => $1)
+            ORDER BY updated_at
+            LIMIT $2
+            FOR UPDATE SKIP LOCKED
+        ), movidas AS (
+            DELETE FROM solicitacoes s USING lote WHERE s.id = lote.id
+            RETURNING s.*
+        )
+        INSERT INTO solicitacoes_arquivo (%1$s) SELECT %1$s FROM movidas
+    $q$, colunas) USING dias, tamanho_lote;
+    GET DIAGNOSTICS movidas = ROW_COUNT;
+    PERFORM set_config('app.arquivando', 'off', true);
+    RETURN movidas;
+END $$;
+
+-- O resumo do painel inclui as solicitações arquivadas
+CREATE OR REPLACE FUNCTION recalcular_resumo_solicitacoes() RETURNS void
+    LANGUAGE sql AS $$
+    LOCK TABLE solicitacoes IN SHARE MODE;
+    LOCK TABLE solicitacoes_arquivo IN SHARE MODE;
+    TRUNCATE resumo_solicitacoes;
+    INSERT INTO resumo_solicitacoes (mes, status, setor_cargo, modelo_equipamento, centro_custo, solicitacoes, itens, valor_total)
+    SELECT date_trunc('month', data_solicitacao AT TIME ZONE 'America/Sao_Paulo')::date,
+           coalesce(status, ''), coalesce(setor_cargo, ''), coalesce(modelo_equipamento, ''), coalesce(centro_custo, ''),
+           count(*), coalesce(sum(quantidade), 0), coalesce(sum(valor), 0)
+    FROM (SELECT data_solicitacao, status, setor_cargo, modelo_equipamento, centro_custo, quantidade, valor FROM solicitacoes
+          UNION ALL
+          SELECT data_solicitacao, status, setor_cargo, modelo_equipamento, centro_custo, quantidade, valor FROM solicitacoes_arquivo) AS todas
+    GROUP BY 1, 2, 3, 4, 5;
+$$;
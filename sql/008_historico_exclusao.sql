@@ -0,0 +1,69 @@
+-- sql/008_historico_exclusao.sql
+-- Excluir uma solicitação encerra o intervalo de status aberto, mas não é o fim de uma manutenção:
+-- o intervalo guarda o motivo do encerramento e as exclusões ficam fora do tempo de manutenção do painel.
+
+ALTER TABLE historico_status ADD COLUMN IF NOT EXISTS motivo_fim text;  -- 'alteracao' ou 'exclusao'
+
+CREATE OR REPLACE FUNCTION _fechar_historico_status(ids bigint[], motivo text DEFAULT 'alteracao') RETURNS void
+    LANGUAGE sql AS $$
+    WITH fechados AS (
+        UPDATE historico_status SET fim = clock_timestamp(), motivo_fim = motivo
+        WHERE solicitacao_id = ANY (ids) AND fim IS NULL
+        RETURNING status, inicio, fim
+    )
+    INSERT INTO resumo_manutencao AS r (mes, intervalos, segundos)
+    SELECT date_trunc('month', fim AT TIME ZONE 'America/Sao_Paulo')::date, count(*), sum(extract(epoch FROM fim - inicio))
+    FROM fechados WHERE status = 'Em Manutenção' AND motivo <> 'exclusao'
+    GROUP BY 1
+    ON CONFLICT (mes) DO UPDATE
+    SET intervalos = r.intervalos + EXCLUDED.intervalos, segundos = r.segundos + EXCLUDED.segundos;
+$$;
+
+-- A versão de um argumento (sql/006) sairia ambígua com o novo padrão
+DROP FUNCTION IF EXISTS _fechar_historico_status(bigint[]);
+
+CREATE OR REPLACE FUNCTION tg_solicitacoes_historico_status() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+BEGIN
+    IF current_setting('app.arquivando', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO historico_status (solicitacao_id, status, inicio)
+        SELECT id, status, data_solicitacao FROM linhas_novas WHERE status IS NOT NULL;
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM _fechar_historico_status(array_agg(n.id), 'alteracao')
+        FROM linhas_novas n JOIN linhas_antigas a ON a.id = n.id
+        WHERE n.status IS DISTINCT FROM a.status;
+        INSERT INTO historico_status (solicitacao_id, status, inicio)
+        SELECT n.id, n.status, clock_timestamp()
+        FROM linhas_novas n JOIN linhas_antigas a ON a.id = n.id
+        WHERE n.status IS DISTINCT FROM a.status AND n.status IS NOT NULL;
+    ELSE
+        PERFORM _fechar_historico_status(array_agg(id), 'exclusao') FROM linhas_antigas;
+    END IF;
+    RETURN NULL;
+END $$;
+
+-- Reconstrói o tempo de manutenção encerrado a partir do histórico, sem os intervalos fechados por exclusão
+CREATE OR REPLACE FUNCTION recalcular_resumo_manutencao() RETURNS void
+    LANGUAGE sql AS $$
+    LOCK TABLE historico_status IN SHARE MODE;
+    TRUNCATE resumo_manutencao;
+    INSERT INTO resumo_manutencao (mes, intervalos, segundos)
+    SELECT date_trunc('month', fim AT TIME ZONE 'America/Sao_Paulo')::date, count(*), sum(extract(epoch FROM fim - inicio))
+    FROM historico_status
+    WHERE status = 'Em Manutenção' AND fim IS NOT NULL AND motivo_fim IS DISTINCT FROM 'exclusao'
+    GROUP BY 1;
+$$;
+
+-- Intervalos já encerrados: o último intervalo de uma solicitação que não existe mais (nem no arquivo)
+-- foi fechado pela exclusão. Os demais foram mudanças de status.
+UPDATE historico_status h SET motivo_fim = CASE
+        WHEN NOT EXISTS (SELECT 1 FROM solicitacoes s WHERE s.id = h.solicitacao_id)
+         AND NOT EXISTS (SELECT 1 FROM solicitacoes_arquivo a WHERE a.id = h.solicitacao_id)
+         AND h.fim = (SELECT max(fim) FROM historico_status u WHERE u.solicitacao_id = h.solicitacao_id)
+        THEN 'exclusao' ELSE 'alteracao' END
+WHERE fim IS NOT NULL AND motivo_fim IS NULL;
+
+SELECT recalcular_resumo_manutencao();
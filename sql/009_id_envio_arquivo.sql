@@ -0,0 +1,7 @@
+-- sql/009_id_envio_arquivo.sql
+-- ON CONFLICT (id_envio) só enxerga a tabela principal: a importação também procura o id_envio no arquivo,
+-- para que reimportar uma planilha cujas linhas já foram arquivadas não as duplique. O índice não é único
+-- porque reimportações anteriores a esta versão podem ter deixado o mesmo id_envio duas vezes no arquivo.
+
+CREATE INDEX IF NOT EXISTS idx_solicitacoes_arquivo_id_envio
+    ON solicitacoes_arquivo (id_envio);
@@ -0,0 +1,63 @@
+# tests/test_db.py
+
+import os
+import sys
+import threading
+
+import psycopg2
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import db
+
+class _Cursor:
+    def __enter__(self): return self
+    def __exit__(self, *erro): return False
+    def execute(self, query, vars=None): pass
+
+class _Conexao:
+    """Conexão falsa: só o que o pool e a verificação de saúde usam."""
+    def __init__(self, abertas):
+        self.closed = 0
+        self.info = type("Info", (), {"transaction_status": psycopg2.extensions.TRANSACTION_STATUS_IDLE})()
+        abertas.append(self)
+    def cursor(self, **kwargs): return _Cursor()
+    def rollback(self): pass
+    def close(self): self.closed = 1
+
+@pytest.fixture
+def abertas(monkeypatch):
+    lista = []
+    monkeypatch.setattr(psycopg2.pool.psycopg2, "connect", lambda *args, **kwargs: _Conexao(lista))
+    return lista
+
+def _retiradas_concorrentes(pool, sessoes, repeticoes):
+    barreira = threading.Barrier(sessoes)
+    def sessao():
+        for _ in range(repeticoes):
+            with pool.conexao():
+                barreira.wait(timeout=5)  # todas as sessões com uma conexão ao mesmo tempo
+    threads = [threading.Thread(target=sessao) for _ in range(sessoes)]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+
+def test_retiradas_concorrentes_reusam_as_conexoes(abertas):
+    pool = db.PoolDeConexoes(1, 10)
+    _retiradas_concorrentes(pool, sessoes=5, repeticoes=20)
+    metricas = pool.metricas()
+    assert metricas["ociosas"] == 5 and metricas["em_uso"] == 0 and metricas["retiradas"] == 100
+    assert len(abertas) == 5 and not any(conn.closed for conn in abertas)
+
+def test_pool_nao_guarda_mais_que_o_maximo(abertas):
+    pool = db.PoolDeConexoes(1, 3)
+    _retiradas_concorrentes(pool, sessoes=3, repeticoes=5)
+    assert pool.metricas()["ociosas"] == 3 and len(abertas) == 3
+
+@pytest.mark.parametrize("termo", ["xt", "a b", "Zé"])
+def test_termo_curto_busca_so_por_prefixo(termo):
+    condicao, params, _, _ = db._condicao_busca(termo)
+    assert "LIKE" not in condicao and "<%" not in condicao and condicao.count("%s") == len(params) == 1
+
+def test_termo_com_palavra_longa_usa_trigramas():
+    condicao, params, _, _ = db._condicao_busca("xt 900")
+    assert "LIKE" in condicao and condicao.count("%s") == len(params) == 3
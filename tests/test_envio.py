@@ -0,0 +1,33 @@
+# tests/test_envio.py
+
+import os
+import sys
+import time
+
+import psycopg2
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import envio
+from envio import FilaDeEnvio, MAX_TENTATIVAS, PENDENTE, FALHOU
+
+@pytest.fixture
+def fila(tmp_path, monkeypatch):
+    monkeypatch.setattr(envio, "INTERVALO_VERIFICACAO", 3600)  # a thread de fundo não disputa as linhas do teste
+    fila = FilaDeEnvio(caminho=str(tmp_path / "caixa.sqlite3"), trabalhadores_upload=1)
+    with fila._conectar() as conn:
+        conn.execute("INSERT INTO envios (id_envio, criado_em, dados, status) VALUES ('a', ?, '{}', ?);", (time.time(), PENDENTE))
+    return fila
+
+def test_banco_fora_do_ar_nao_esgota_as_tentativas(fila):
+    for _ in range(3 * MAX_TENTATIVAS):
+        fila._registrar_falha(["a"], psycopg2.OperationalError("could not connect to server"))
+    fila._registrar_falha(["a"], "Falha ao enviar a foto: timeout")
+    assert fila.situacao(["a"])["a"]["status"] == PENDENTE
+
+def test_erro_nos_dados_esgota_as_tentativas(fila):
+    for _ in range(MAX_TENTATIVAS - 1):
+        fila._registrar_falha(["a"], psycopg2.DataError("value too long"))
+    assert fila.situacao(["a"])["a"]["status"] == PENDENTE
+    fila._registrar_falha(["a"], psycopg2.DataError("value too long"))
+    assert fila.situacao(["a"])["a"]["status"] == FALHOU
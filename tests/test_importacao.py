@@ -0,0 +1,46 @@
+# tests/test_importacao.py
+
+import os
+import sys
+import warnings
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from importacao import validar, OBRIGATORIAS
+
+def _planilha(datas):
+    linhas = [{coluna: f"{coluna} {i}" for coluna in OBRIGATORIAS} | {"data_solicitacao": data} for i, data in enumerate(datas)]
+    return pd.DataFrame(linhas, dtype=str)
+
+@pytest.mark.parametrize("datas", [
+    ["2025-03-14T10:00:00-03:00", "14/03/2025"],
+    ["2025-03-14T13:00:00Z", "2025-03-14"],
+    ["2025-03-14 13:00:00+00:00", "14/03/2025 10:00", "2025-03-14T10:00"],
+])
+def test_datas_com_e_sem_fuso_na_mesma_coluna(datas):
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", FutureWarning)
+        validas, erros = validar(_planilha(datas))
+    assert erros.empty
+    assert str(validas["data_solicitacao"].dt.tz) == "America/Sao_Paulo"
+    assert validas["data_solicitacao"].iloc[0] == pd.Timestamp("2025-03-14 10:00", tz="America/Sao_Paulo")
+
+def test_data_invalida_vira_erro_da_linha():
+    validas, erros = validar(_planilha(["2025-03-14T10:00:00-03:00", "31/02/2025", "ontem", "14/03/2025"]))
+    assert len(validas) == 2
+    assert erros["linha"].tolist() == [3, 4]
+    assert set(erros["coluna"]) == {"data_solicitacao"}
+
+def test_id_envio_nao_depende_da_posicao():
+    planilha = _planilha(["14/03/2025", "15/03/2025", "16/03/2025"])
+    ids = dict(zip(planilha["solicitante"], validar(planilha)[0]["id_envio"]))
+    sem_primeira = planilha.iloc[1:]
+    assert dict(zip(sem_primeira["solicitante"], validar(sem_primeira)[0]["id_envio"])) == {k: v for k, v in ids.items() if k != "solicitante 0"}
+
+def test_linhas_identicas_tem_ids_distintos_e_estaveis():
+    planilha = pd.concat([_planilha(["14/03/2025"])] * 3, ignore_index=True)
+    ids = validar(planilha)[0]["id_envio"].tolist()
+    assert len(set(ids)) == 3
+    assert validar(planilha.iloc[:2])[0]["id_envio"].tolist() == ids[:2]
@@ -0,0 +1,34 @@
+# tests/test_utils.py
+
+import os
+
+from streamlit.testing.v1 import AppTest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _inicio(nome="Fulano Admin"):
+    at = AppTest.from_file(os.path.join(RAIZ, "Início.py"))
+    at.secrets["auth"] = {"master_password": "mestre", "admin_password": "admin-secreta", "admins": [nome]}
+    at.session_state["autenticado"] = True
+    at.session_state["identificado"] = True
+    at.session_state["nome"] = nome
+    at.session_state["setor_cargo"] = "TI / Analista"
+    return at.run()
+
+def _tem_painel(at):
+    return any(expander.label == "⏱️ Desempenho" for expander in at.sidebar.expander)
+
+def test_nome_digitado_nao_libera_o_painel():
+    assert not _tem_painel(_inicio())
+
+def test_senha_errada_nao_libera_o_painel():
+    at = _inicio()
+    at.sidebar.text_input(key="senha_admin").input("mestre")
+    at.sidebar.button(key="liberar_admin").click().run()
+    assert not _tem_painel(at) and at.sidebar.error
+
+def test_senha_de_administrador_libera_o_painel():
+    at = _inicio()
+    at.sidebar.text_input(key="senha_admin").input("admin-secreta")
+    at.sidebar.button(key="liberar_admin").click().run()
+    assert _tem_painel(at)
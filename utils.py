@@ -1,18 +1,104 @@
 # utils.py
 
+import io
+import os
+import hmac
+import logging
+
 import streamlit as st
+from instrumentacao import iniciar_execucao, ultima_execucao, percentis
+
+CAMINHO_LOGO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "logo.png")
+LARGURA_LOGO = 150
+
+logger = logging.getLogger(__name__)
+
+@st.cache_resource
+def _logo():
+    """
+    Logo do cabeçalho já reduzido à largura exibida, lido e convertido uma vez por processo: sem isso,
+    cada execução de cada página relia o PNG original e o st.image o redimensionava de novo.
+    """
+    from PIL import Image
+    with Image.open(CAMINHO_LOGO) as img:
+        img.thumbnail((LARGURA_LOGO, img.height), Image.Resampling.LANCZOS)
+        saida = io.BytesIO()
+        img.save(saida, "PNG", optimize=True)
+    return saida.getvalue()
+
+def usuario_admin():
+    """
+    O painel de desempenho só aparece para quem informou, nesta sessão, a senha de administrador do
+    secrets.toml ([auth] admin_password), separada da senha mestre. O nome digitado no login não conta.
+    """
+    return st.session_state.get("admin", False)
+
+def _acesso_admin():
+    """Campo recolhível da sidebar para liberar o painel de desempenho com a senha de administrador."""
+    try:
+        senha_admin = st.secrets["auth"].get("admin_password")
+    except Exception:
+        return
+    if not senha_admin or not st.session_state.get("identificado", False):
+        return
+    with st.sidebar.expander("🔒 Administração"):
+        senha_digitada = st.text_input("Senha de administrador", type="password", key="senha_admin")
+        if st.button("Liberar painel de desempenho", key="liberar_admin"):
+            if hmac.compare_digest(senha_digitada.encode(), str(senha_admin).encode()):
+                st.session_state.admin = True; st.rerun()
+            else:
+                st.error("Senha de administrador incorreta.")
+
+def painel_desempenho():
+    """
+    Painel recolhível da sidebar com o tempo de cada fase da última execução da página (consultas SQL
+    recuadas dentro da fase que as disparou), os percentis das medições recentes do processo e o uso do pool de conexões.
+    """
+    import pandas as pd
+    from db import get_pool
+    with st.sidebar.expander("⏱️ Desempenho"):
+        ultima = ultima_execucao()
+        if ultima:
+            total = sum(registro["ms"] for registro in ultima if registro["profundidade"] == 0)
+            st.caption(f"Última execução: {total:.0f} ms")
+            st.dataframe(pd.DataFrame([{"fase": "\u2003" * r["profundidade"] + r["fase"], "ms": r["ms"], "linhas": r.get("linhas")}
+                                       for r in ultima]), hide_index=True, use_container_width=True)
+        else:
+            st.caption("Nenhuma medição na última execução.")
+        linhas = percentis()
+        if linhas:
+            st.caption("Medições recentes (todas as sessões)")
+            st.dataframe(pd.DataFrame(linhas), hide_index=True, use_container_width=True)
+        try:
+            metricas = get_pool().metricas()
+        except Exception as e:
+            st.caption(f"Pool de conexões indisponível: {e}"); return
+        st.caption("Pool de conexões (processo)")
+        st.dataframe(pd.DataFrame([metricas]), hide_index=True, use_container_width=True)
+
+def _iniciar_fila_de_envio():
+    """
+    Cria a fila de envio (uma por processo) na primeira página aberta: depois de um reinício, os envios que
+    ficaram na caixa de saída são gravados sem esperar um novo envio na página de solicitação.
+    """
+    try:
+        from envio import get_fila
+        get_fila()
+    except Exception as e:
+        logger.exception("Não foi possível iniciar a fila de envio: %s", e)
 
 def configurar_pagina(titulo_pagina):
     """
     Configura o layout da página, adicionando o logo, o título e a sidebar.
     """
     st.set_page_config(layout="wide", page_title=titulo_pagina)
+    iniciar_execucao()
 
     # --- CABEÇALHO COM LOGO E TÍTULO ---
     col1, col2 = st.columns([1, 4]) # Proporção das colunas
     with col1:
         try:
-            st.image("assets/logo.png", width=150)
+            st.image(_logo(), width=LARGURA_LOGO)
         except Exception as e:
             st.error(f"Erro ao carregar o logo: {e}")
     with col2:
@@ -22,6 +108,11 @@ def configurar_pagina(titulo_pagina):
     if st.session_state.get("identificado", False):
         st.sidebar.markdown(f"Bem-vindo, **{st.session_state.nome.split(' ')[0]}**!")
         st.sidebar.markdown("---")
+    if usuario_admin():
+        painel_desempenho()
+    else:
+        _acesso_admin()
     
     # Adiciona a assinatura no final da sidebar para ficar em todas as páginas
     st.sidebar.caption("Desenvolvido por 🧙‍♂️ Fabio Sena 🧙‍♂️ | Versão 1.4")
+    _iniciar_fila_de_envio()